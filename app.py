@@ -3,9 +3,10 @@ Main Streamlit application for LLM RAG Contract Analyzer
 """
 import streamlit as st
 import os
+import re
+import asyncio
 from pathlib import Path
-from services.document_service import DocumentService
-from models.document import Document
+from config import config
 
 # Configure page
 st.set_page_config(
@@ -18,8 +19,56 @@ st.set_page_config(
 # Initialize services
 @st.cache_resource
 def get_document_service():
+    # Imported here so PyMuPDF, Tesseract, ChromaDB and OpenAI load once, off the page render path
+    from services.document_service import DocumentService
     return DocumentService()
 
+class DocumentProcessingError(Exception):
+    """Raised so that failed or not yet vectorized processing results are not memoized"""
+    def __init__(self, result):
+        super().__init__(result.get("error", "processing failed"))
+        self.result = result
+
+# Heavy document fields left out of cached results; the chunks stay in ChromaDB and the file in the uploads folder
+_UNCACHED_DOCUMENT_FIELDS = ("text_content", "chunks", "chunk_models")
+
+# Words the fallback text search looks for; shorter ones ("o", "a", "de") and punctuation match nearly every line
+_KEYWORD_PATTERN = re.compile(r'\w{3,}')
+
+@st.cache_data(ttl=24 * 3600, max_entries=64, show_spinner=False)
+def process_document_cached(content_hash: str, document_id: str, vector_generation: int, _document_data: dict) -> dict:
+    """
+    Run the complete processing pipeline once per file content
+    
+    Only the document's ids, metadata, statistics and contract information are
+    cached, and only once its vectors are stored. Vectors stay in ChromaDB
+    under the document ID, so the key also carries that ID and the vector
+    store's removal generation: once the document or its vectors are deleted,
+    or the collection is reset, the same file is processed and vectorized again.
+    """
+    doc_service = get_document_service()
+    try:
+        asyncio.get_running_loop()
+        loop_running = True
+    except RuntimeError:
+        loop_running = False
+    
+    if loop_running:
+        # asyncio.run cannot nest inside the running event loop
+        result = doc_service.process_document_complete(_document_data)
+    else:
+        result = asyncio.run(doc_service.aprocess_document_complete(_document_data))
+    
+    # Only cache fully vectorized documents; queued chunks may still fail to be stored
+    vector_info = result["data"]["vector_info"] if result["success"] else {}
+    if not vector_info.get("vectors_stored"):
+        raise DocumentProcessingError(result)
+    
+    document = {
+        key: value for key, value in result["data"]["document"].items() if key not in _UNCACHED_DOCUMENT_FIELDS
+    }
+    return {**result, "data": {**result["data"], "document": document}}
+
 def main():
     """Main application function"""
     st.markdown("""
@@ -50,6 +99,11 @@ def main():
         else:
             st.success("✅ API OpenAI configurada")
         
+        # Retrieval settings (fewer, more relevant chunks means fewer LLM input tokens)
+        top_k = st.slider("Trechos consultados (top_k)", min_value=1, max_value=10, value=min(config.RAG_TOP_K, 10))
+        min_similarity = st.slider("Relevância mínima", min_value=0.0, max_value=1.0,
+                                   value=config.RAG_MIN_SIMILARITY, step=0.05)
+        
         st.markdown("---")
         
         # Document management
@@ -83,19 +137,16 @@ def main():
         
         if uploaded_file:
             # Display file information
-            file_size_mb = len(uploaded_file.getvalue()) / (1024 * 1024)
+            file_size_mb = uploaded_file.size / (1024 * 1024)
             st.info(f"📄 **{uploaded_file.name}**")
             st.caption(f"Tamanho: {file_size_mb:.2f} MB | Tipo: {uploaded_file.type}")
             
             # Upload button
             if st.button("📤 Processar Upload", type="primary"):
                 with st.spinner("Processando upload..."):
-                    # Get file content
-                    file_content = uploaded_file.getvalue()
-                    
-                    # Upload document
+                    # Upload document, streaming the file to disk
                     result = doc_service.upload_document(
-                        file_content=file_content,
+                        file_content=uploaded_file,
                         filename=uploaded_file.name,
                         user_id="default_user"
                     )
@@ -108,7 +159,15 @@ def main():
                         
                         # Process complete document (text + vectors)
                         with st.spinner("Processando documento (texto + vetorização)..."):
-                            text_result = doc_service.process_document_complete(result["data"])
+                            try:
+                                text_result = process_document_cached(
+                                    result["data"]["file_hash"],
+                                    result["data"]["document"]["id"],
+                                    doc_service.vector_service.removal_generation,
+                                    result["data"]
+                                )
+                            except DocumentProcessingError as e:
+                                text_result = e.result
                             
                             if text_result["success"]:
                                 st.session_state.uploaded_document = text_result["data"]["document"]
@@ -131,15 +190,21 @@ def main():
                                 
                                 # Show PDF processing method
                                 if metadata.get("fallback_used"):
-                                    st.info("⚙️ **Processamento**: Método de fallback usado (PyPDF2)")
+                                    st.info("⚙️ **Processamento**: Método de fallback usado (pypdfium2)")
                                 elif metadata.get("format") == "pdf":
                                     st.success("⚙️ **Processamento**: PyMuPDF usado (suporte completo a imagens)")
                                 
                                 # Display vector info if available
                                 vector_info = text_result["data"].get("vector_info", {})
+                                st.session_state.vectors_queued = False
                                 if vector_info.get("vectors_stored"):
                                     st.success(f"🔍 **Vetorização**: {vector_info['chunks_vectorized']} chunks vetorizados")
                                     st.session_state.vectors_available = True
+                                elif vector_info.get("vectors_queued"):
+                                    # Semantic search is enabled once the background ingestion reports the chunks stored
+                                    st.info(f"🔍 **Vetorização em andamento**: {vector_info['chunks_queued']} chunks na fila")
+                                    st.session_state.vectors_available = False
+                                    st.session_state.vectors_queued = True
                                 else:
                                     st.warning("⚠️ **Vetorização falhou**: Busca semântica não disponível")
                                     st.session_state.vectors_available = False
@@ -174,6 +239,20 @@ def main():
             st.success("📄 Documento carregado e pronto!")
             doc = st.session_state.uploaded_document
             st.caption(f"ID: {doc['id'][:8]}... | Status: {doc['status']}")
+            
+            # Follow the background ingestion of queued chunks
+            if st.session_state.get("vectors_queued"):
+                ingest_result = doc_service.vector_service.get_ingest_status(doc["id"])
+                ingest_status = ingest_result["data"] if ingest_result["success"] else {"status": "failed", "error": ingest_result["error"]}
+                if ingest_status["status"] == "stored":
+                    st.session_state.vectors_queued = False
+                    st.session_state.vectors_available = True
+                elif ingest_status["status"] == "queued":
+                    st.info("🔍 Vetorização em andamento - busca simples até a conclusão")
+                elif ingest_status["status"] == "retrying":
+                    st.warning(f"⚠️ Vetorização falhou, nova tentativa em andamento: {ingest_status['error']}")
+                else:
+                    st.error(f"❌ Vetorização falhou: {ingest_status['error']}")
     
     with col2:
         st.header("📒 Consulta ao Documento")
@@ -199,17 +278,19 @@ def main():
                     if contract_info.get("contract_duration"):
                         st.info(f"📅 **Duração do Contrato**: {', '.join(contract_info['contract_duration'])}")
             
-            # Query interface
-            question = st.text_input(
-                "Faça uma pergunta sobre o contrato:",
-                placeholder="Ex: Quero saber o número do contrato e trechos sobre SLA"
-            )
+            # Query interface (a form so typing does not rerun the analysis on every keystroke)
+            with st.form("query_form"):
+                question = st.text_input(
+                    "Faça uma pergunta sobre o contrato:",
+                    placeholder="Ex: Quero saber o número do contrato e trechos sobre SLA"
+                )
+                submitted = st.form_submit_button("▶️ Analisar")
             
             # Query analysis and suggestions
-            if question and not st.button("▶️ Analisar"):
+            if submitted:
                 # Show query intent analysis
-                intent_result = doc_service.analyze_query_intent(question)
-                if intent_result["success"]:
+                intent_result = doc_service.analyze_query_intent(question) if question else None
+                if intent_result and intent_result["success"]:
                     intent_data = intent_result["data"]
                     if intent_data.get("primary_intent"):
                         intent_emoji = {
@@ -233,11 +314,13 @@ def main():
                         vectors_available = getattr(st.session_state, 'vectors_available', False)
                         
                         if vectors_available and document_id:
-                            # Use full RAG system
-                            rag_result = doc_service.query_document(
+                            # Use full RAG system, streaming the answer as it is generated
+                            rag_result = doc_service.query_document_stream(
                                 document_id=document_id,
                                 question=question,
-                                user_id="default_user"
+                                user_id="default_user",
+                                top_k=top_k,
+                                min_similarity=min_similarity
                             )
                             
                             st.markdown("### 🤖 Resposta RAG:")
@@ -246,27 +329,47 @@ def main():
                             
                             if rag_result["success"]:
                                 rag_data = rag_result["data"]
-                                query_response = rag_data["query_response"]
                                 
                                 # Show LLM-generated answer
-                                confidence = query_response.get("confidence_score", 0.8)
+                                if "answer_stream" in rag_data:
+                                    confidence = rag_data.get("confidence_score", 0.8)
+                                else:
+                                    confidence = rag_data["query_response"].get("confidence_score", 0.8)
                                 confidence_color = "🟢" if confidence > 0.8 else "🟡" if confidence > 0.6 else "🔴"
                                 
                                 st.success(f"{confidence_color} **Resposta** (Confiança: {confidence:.1%}):")
-                                st.markdown(query_response["answer"])
+                                
+                                if "answer_stream" in rag_data:
+                                    # Render tokens as they arrive
+                                    answer_placeholder = st.empty()
+                                    answer = ""
+                                    for token in rag_data["answer_stream"]:
+                                        answer += token
+                                        answer_placeholder.markdown(answer + "▌")
+                                    answer_placeholder.markdown(answer)
+                                else:
+                                    answer = rag_data["query_response"]["answer"]
+                                    st.markdown(answer)
+                                
+                                st.session_state.last_answer = answer
                                 
                                 # Show sources used
                                 if rag_data.get("search_results"):
                                     with st.expander(f"📚 Fontes Consultadas ({len(rag_data['search_results'])} trechos)", expanded=False):
+                                        # Build all sources into one markdown block so they render in a single element
+                                        source_parts = []
                                         for i, result in enumerate(rag_data["search_results"], 1):
                                             similarity = result["relevance_score"]
                                             metadata = result.get("metadata", {})
                                             page_num = metadata.get("page_number", 0)
+                                            content = result["content"][:300] + "..." if len(result["content"]) > 300 else result["content"]
                                             
-                                            st.markdown(f"**Fonte {i}** - Relevância: {similarity:.1%}" + 
-                                                      (f" (Página {page_num})" if page_num > 0 else ""))
-                                            st.text(result["content"][:300] + "..." if len(result["content"]) > 300 else result["content"])
-                                            st.markdown("---")
+                                            source_parts.append(
+                                                f"**Fonte {i}** - Relevância: {similarity:.1%}" +
+                                                (f" (Página {page_num})" if page_num > 0 else "") +
+                                                f"\n\n```\n{content}\n```\n\n---\n"
+                                            )
+                                        st.markdown("".join(source_parts))
                                 
                                 # Show intent analysis if available
                                 if rag_data.get("intent_analysis"):
@@ -286,7 +389,8 @@ def main():
                                 search_result = doc_service.search_document(
                                     document_id=document_id,
                                     query=question,
-                                    top_k=3
+                                    top_k=min(3, top_k),
+                                    min_similarity=min_similarity
                                 )
                                 
                                 if search_result["success"] and search_result["data"]["results"]:
@@ -309,13 +413,18 @@ def main():
                                 relevant_sections = []
                                 lines = text_content.split('\n')
                                 
-                                for i, line in enumerate(lines):
-                                    if any(keyword in line.lower() for keyword in question_lower.split()):
-                                        # Get context (line before and after)
-                                        start = max(0, i-1)
-                                        end = min(len(lines), i+2)
-                                        context = '\n'.join(lines[start:end])
-                                        relevant_sections.append(context)
+                                # Match all keywords in a single pass per line; without any, nothing is relevant
+                                keywords = dict.fromkeys(_KEYWORD_PATTERN.findall(question_lower))
+                                if keywords:
+                                    keyword_pattern = re.compile('|'.join(map(re.escape, keywords)), re.IGNORECASE)
+                                    
+                                    for i, line in enumerate(lines):
+                                        if keyword_pattern.search(line):
+                                            # Get context (line before and after)
+                                            start = max(0, i-1)
+                                            end = min(len(lines), i+2)
+                                            context = '\n'.join(lines[start:end])
+                                            relevant_sections.append(context)
                                 
                                 st.markdown("### 📋 Resposta:")
                                 st.markdown(f"**Pergunta:** {question}")
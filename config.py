@@ -3,7 +3,7 @@ Configuration management for LLM RAG Contract Analyzer
 """
 import os
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Optional, Dict, Any
 
 # Load environment variables
 load_dotenv()
@@ -14,7 +14,8 @@ class Config:
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4")
-    OPENAI_EMBEDDING_MODEL: str = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+    OPENAI_EMBEDDING_MODEL: str = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+    OPENAI_EMBEDDING_DIMS: int = int(os.getenv("OPENAI_EMBEDDING_DIMS", "512"))
     
     # File Upload Configuration
     MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
@@ -23,8 +24,62 @@ class Config:
     
     # Vector Database Configuration
     VECTOR_DB_PATH: str = os.getenv("VECTOR_DB_PATH", "./chroma_db")
-    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "1000"))
-    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "200"))
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "600"))
+    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "100"))
+    # Largest number of records sent to ChromaDB in a single add call
+    CHROMA_MAX_BATCH_SIZE: int = int(os.getenv("CHROMA_MAX_BATCH_SIZE", "5000"))
+    
+    # OCR Configuration
+    # Pages with at least this many characters of native text skip image OCR (0 always runs OCR)
+    OCR_MIN_PAGE_CHARS: int = int(os.getenv("OCR_MIN_PAGE_CHARS", "200"))
+    # Pages whose images cover more than this fraction of the page are OCRed even with native text
+    OCR_IMAGE_COVERAGE: float = float(os.getenv("OCR_IMAGE_COVERAGE", "0.5"))
+    # Worker processes for OCR (0 uses all CPU cores, 1 runs OCR sequentially)
+    OCR_MAX_WORKERS: int = int(os.getenv("OCR_MAX_WORKERS", "0"))
+    # Embedded images above this resolution are downscaled before OCR (0 keeps full resolution)
+    OCR_TARGET_DPI: int = int(os.getenv("OCR_TARGET_DPI", "200"))
+    # Images with a longer side than this are shrunk before OCR (0 keeps any size)
+    OCR_MAX_IMAGE_SIDE: int = int(os.getenv("OCR_MAX_IMAGE_SIDE", "3000"))
+    
+    # Retrieval Configuration
+    RAG_TOP_K: int = int(os.getenv("RAG_TOP_K", "5"))
+    # Chunks scoring below this relevance are not sent to the LLM (0 keeps all top_k results)
+    RAG_MIN_SIMILARITY: float = float(os.getenv("RAG_MIN_SIMILARITY", "0.0"))
+    
+    # Semantic Answer Cache Configuration
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    # Cosine similarity a new question needs with a cached one to reuse its answer
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    # Cached answers kept per document (least recently used are evicted first)
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024"))
+    # Reuse semantic search results of near-identical queries (same threshold, cleared on every write)
+    SEARCH_CACHE_ENABLED: bool = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "512"))
+    # Answer suggested questions with the retrieved snippets instead of calling the LLM
+    CANNED_QUERY_FALLBACK: bool = os.getenv("CANNED_QUERY_FALLBACK", "false").lower() == "true"
+    
+    # Embedding Configuration
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+    EMBEDDING_MAX_CONCURRENCY: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "16"))
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    
+    # OpenAI Batch API Configuration (bulk ingestion)
+    OPENAI_BATCH_ENABLED: bool = os.getenv("OPENAI_BATCH_ENABLED", "false").lower() == "true"
+    OPENAI_BATCH_THRESHOLD: int = int(os.getenv("OPENAI_BATCH_THRESHOLD", "500"))
+    OPENAI_BATCH_POLL_INTERVAL: int = int(os.getenv("OPENAI_BATCH_POLL_INTERVAL", "30"))
+    # Seconds an upload waits for a batch before cancelling it and embedding directly (0 waits indefinitely)
+    OPENAI_BATCH_MAX_WAIT: int = int(os.getenv("OPENAI_BATCH_MAX_WAIT", "600"))
+    
+    # Background Ingestion Queue (uploads return before chunks are embedded and stored)
+    INGEST_QUEUE_ENABLED: bool = os.getenv("INGEST_QUEUE_ENABLED", "false").lower() == "true"
+    # Seconds the worker waits for more documents to embed together
+    INGEST_QUEUE_BATCH_WAIT: float = float(os.getenv("INGEST_QUEUE_BATCH_WAIT", "2.0"))
+    # Retries, with exponential backoff, before a failed document waits for the next restart
+    INGEST_QUEUE_MAX_RETRIES: int = int(os.getenv("INGEST_QUEUE_MAX_RETRIES", "5"))
+    
+    # Logging Configuration
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FILE: str = os.getenv("LOG_FILE", "")
     
     # Application Configuration
     APP_TITLE: str = "Analisador de Contratos LLM RAG"
@@ -43,5 +98,29 @@ class Config:
             raise ValueError("OPENAI_API_KEY is required")
         return True
 
+def get_embedding_params(model: str, dimensions: int) -> Dict[str, Any]:
+    """
+    Build the model arguments for an OpenAI embeddings request
+    
+    Args:
+        model: Embedding model name
+        dimensions: Requested output dimensions (0 keeps the model default)
+        
+    Returns:
+        Dictionary with model and, when supported, dimensions
+    """
+    params = {"model": model}
+    
+    # Only text-embedding-3 models accept a reduced output dimension
+    if model.startswith("text-embedding-3") and dimensions > 0:
+        params["dimensions"] = dimensions
+    
+    return params
+
+def get_embedding_model_key(model: str, dimensions: int) -> str:
+    """Identify the embedding space produced by a model and dimension setting"""
+    params = get_embedding_params(model, dimensions)
+    return f"{model}:{params['dimensions']}" if "dimensions" in params else model
+
 # Create config instance
 config = Config()
\ No newline at end of file
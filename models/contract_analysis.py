@@ -1,13 +1,20 @@
 """
 Contract analysis data models
 """
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
-from enum import Enum
+from collections import Counter
 import uuid
 
-class ClauseType(str, Enum):
+# Literal types validate as a plain membership check and dump as strings
+ClauseTypeLit = Literal[
+    "sla", "fibra_optica", "multa", "prazo_contrato", "termination",
+    "payment", "liability", "confidentiality", "other"
+]
+RiskLevelLit = Literal["low", "medium", "high"]
+
+class ClauseType:
     """Types of contract clauses"""
     SLA = "sla"
     FIBRA_OPTICA = "fibra_optica"
@@ -19,7 +26,7 @@ class ClauseType(str, Enum):
     CONFIDENTIALITY = "confidentiality"
     OTHER = "other"
 
-class RiskLevel(str, Enum):
+class RiskLevel:
     """Risk levels for contract clauses"""
     LOW = "low"
     MEDIUM = "medium"
@@ -36,11 +43,11 @@ class DocumentLocation(BaseModel):
 class ContractClause(BaseModel):
     """Contract clause model"""
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    type: ClauseType
+    type: ClauseTypeLit
     content: str
     location: DocumentLocation
     summary: str
-    risk_level: RiskLevel = RiskLevel.LOW
+    risk_level: RiskLevelLit = RiskLevel.LOW
     key_terms: Dict[str, Any] = Field(default_factory=dict)
     
     # Specific fields for operator contracts
@@ -48,19 +55,20 @@ class ContractClause(BaseModel):
     fiber_km: Optional[str] = None
     penalty_value: Optional[str] = None
     contract_duration: Optional[str] = None
-    
-    class Config:
-        use_enum_values = True
 
 class RiskFlag(BaseModel):
     """Risk flag for contract analysis"""
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     type: str
     description: str
-    severity: RiskLevel
+    severity: RiskLevelLit
     location: Optional[DocumentLocation] = None
     recommendation: Optional[str] = None
 
+# Adapters for validating lists of clauses and risk flags in one call
+CLAUSE_LIST_ADAPTER = TypeAdapter(List[ContractClause])
+RISK_FLAG_LIST_ADAPTER = TypeAdapter(List[RiskFlag])
+
 class ContractAnalysis(BaseModel):
     """Complete contract analysis model"""
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -78,16 +86,35 @@ class ContractAnalysis(BaseModel):
     
     def calculate_metrics(self):
         """Calculate analysis metrics"""
+        counts = Counter(c.risk_level for c in self.identified_clauses)
         self.total_clauses = len(self.identified_clauses)
-        self.high_risk_count = len([c for c in self.identified_clauses if c.risk_level == RiskLevel.HIGH])
-        self.medium_risk_count = len([c for c in self.identified_clauses if c.risk_level == RiskLevel.MEDIUM])
-        self.low_risk_count = len([c for c in self.identified_clauses if c.risk_level == RiskLevel.LOW])
+        self.high_risk_count = counts[RiskLevel.HIGH]
+        self.medium_risk_count = counts[RiskLevel.MEDIUM]
+        self.low_risk_count = counts[RiskLevel.LOW]
     
     def add_clause(self, clause: ContractClause):
         """Add a clause to the analysis"""
         self.identified_clauses.append(clause)
+        
+        # Metrics are out of sync (e.g. clauses passed at construction), rebuild them once
+        if self.total_clauses != len(self.identified_clauses) - 1:
+            self.calculate_metrics()
+            return
+        
+        # Update metrics incrementally instead of rescanning all clauses
+        counter_name = f"{clause.risk_level}_risk_count"
+        self.total_clauses += 1
+        setattr(self, counter_name, getattr(self, counter_name) + 1)
+    
+    def add_clauses(self, clauses_data: List[Dict[str, Any]]):
+        """Validate and add a batch of raw clause dictionaries"""
+        self.identified_clauses.extend(CLAUSE_LIST_ADAPTER.validate_python(clauses_data))
         self.calculate_metrics()
     
     def add_risk_flag(self, risk_flag: RiskFlag):
         """Add a risk flag to the analysis"""
-        self.risk_flags.append(risk_flag)
\ No newline at end of file
+        self.risk_flags.append(risk_flag)
+    
+    def add_risk_flags(self, risk_flags_data: List[Dict[str, Any]]):
+        """Validate and add a batch of raw risk flag dictionaries"""
+        self.risk_flags.extend(RISK_FLAG_LIST_ADAPTER.validate_python(risk_flags_data))
\ No newline at end of file
@@ -1,12 +1,50 @@
 """
 Document data models for contract analysis
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
+import itertools
+import os
+import threading
 import uuid
 
+# Cheap unique IDs for internal objects: random per-process prefix plus a counter
+_ID_PREFIX = uuid.uuid4().hex[:16]
+_ID_COUNTER = itertools.count()
+
+# Per-thread pool of random UUIDs for user-facing IDs, refilled from one urandom call
+_UUID_POOL_SIZE = 16
+_uuid_pool = threading.local()
+
+def _fast_id() -> str:
+    """Generate a process-unique ID without calling uuid4"""
+    return f"{_ID_PREFIX}{next(_ID_COUNTER):016x}"
+
+def _pooled_uuid4() -> str:
+    """Generate a random UUID4 string from a pre-filled pool"""
+    ids = getattr(_uuid_pool, "ids", None)
+    if not ids:
+        raw = os.urandom(16 * _UUID_POOL_SIZE)
+        ids = _uuid_pool.ids = [
+            str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, len(raw), 16)
+        ]
+    return ids.pop()
+
+def _reset_id_state():
+    """Give forked child processes their own prefix and UUID pool so IDs never repeat"""
+    global _ID_PREFIX, _ID_COUNTER
+    _ID_PREFIX = uuid.uuid4().hex[:16]
+    _ID_COUNTER = itertools.count()
+    _uuid_pool.ids = []
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_id_state)
+
+# Shared model configuration so every model dumps enums as plain values
+BASE_CONFIG = ConfigDict(use_enum_values=True, extra='ignore', validate_assignment=False)
+
 class DocumentStatus(str, Enum):
     """Document processing status"""
     UPLOADED = "uploaded"
@@ -20,9 +58,14 @@ class FileType(str, Enum):
     DOCX = "docx"
     TXT = "txt"
 
+# File extension -> FileType, a plain dict lookup instead of the Enum value search
+FILE_TYPE_MAP = {file_type.value: file_type for file_type in FileType}
+
 class Document(BaseModel):
     """Document model"""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    model_config = BASE_CONFIG
+    
+    id: str = Field(default_factory=_pooled_uuid4)
     user_id: str = Field(default="default_user")
     filename: str
     file_type: FileType
@@ -31,21 +74,25 @@ class Document(BaseModel):
     processed_at: Optional[datetime] = None
     status: DocumentStatus = DocumentStatus.UPLOADED
     text_content: Optional[str] = None
-    
-    class Config:
-        use_enum_values = True
 
 class DocumentSection(BaseModel):
     """Document section with location information"""
+    model_config = BASE_CONFIG
+    
     content: str
     page_number: Optional[int] = None
-    section_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    section_id: str = Field(default_factory=_fast_id)
     start_char: Optional[int] = None
     end_char: Optional[int] = None
     relevance_score: Optional[float] = None
 
+# Adapter for validating lists of sections in one call
+SECTION_LIST_ADAPTER = TypeAdapter(List[DocumentSection])
+
 class QueryResponse(BaseModel):
     """Query response model"""
+    model_config = BASE_CONFIG
+    
     question: str
     answer: str
     sources: List[DocumentSection] = Field(default_factory=list)
@@ -54,7 +101,9 @@ class QueryResponse(BaseModel):
 
 class QuerySession(BaseModel):
     """Query session model"""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    model_config = BASE_CONFIG
+    
+    id: str = Field(default_factory=_fast_id)
     user_id: str = Field(default="default_user")
     document_id: str
     created_at: datetime = Field(default_factory=datetime.now)
@@ -62,4 +111,8 @@ class QuerySession(BaseModel):
     
     def add_query(self, query_response: QueryResponse):
         """Add a query response to the session"""
-        self.queries.append(query_response)
\ No newline at end of file
+        self.queries.append(query_response)
+    
+    def bulk_add_queries(self, query_responses: List[QueryResponse]):
+        """Add several query responses to the session at once"""
+        self.queries.extend(query_responses)
\ No newline at end of file
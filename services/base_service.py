@@ -3,33 +3,86 @@ Base service class with common functionality
 """
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
+import atexit
 import logging
+import logging.handlers
+import queue
+import threading
+
+from config import config
+
+# Shared queue handler; records are written by a background listener thread
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_queue_handler_lock = threading.Lock()
+
+# Response template copied by success_response (a dict copy is cheaper than building the literal)
+_SUCCESS_TEMPLATE = {"success": True, "message": "Success"}
+
+def _get_queue_handler() -> logging.handlers.QueueHandler:
+    """Create the shared logging queue and start its listener on first use"""
+    global _queue_handler
+    
+    with _queue_handler_lock:
+        if _queue_handler is None:
+            formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+            handlers = [logging.StreamHandler()]
+            if config.LOG_FILE:
+                handlers.append(logging.FileHandler(config.LOG_FILE, encoding="utf-8"))
+            for handler in handlers:
+                handler.setFormatter(formatter)
+            
+            log_queue = queue.Queue()
+            listener = logging.handlers.QueueListener(log_queue, *handlers)
+            listener.start()
+            atexit.register(listener.stop)
+            
+            _queue_handler = logging.handlers.QueueHandler(log_queue)
+    
+    return _queue_handler
 
 class BaseService(ABC):
     """Base service class"""
     
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
+        
+        # Route service logs through the queue so callers never block on stream or file I/O
+        queue_handler = _get_queue_handler()
+        if queue_handler not in self.logger.handlers:
+            self.logger.addHandler(queue_handler)
+            self.logger.setLevel(config.LOG_LEVEL)
+            self.logger.propagate = False
     
     def log_info(self, message: str, **kwargs):
         """Log info message"""
-        self.logger.info(message, extra=kwargs)
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(message, extra=kwargs)
     
     def log_error(self, message: str, error: Exception = None, **kwargs):
         """Log error message"""
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
         if error:
-            self.logger.error(f"{message}: {str(error)}", extra=kwargs)
+            # Lazy %-formatting, the record is only rendered by the listener
+            self.logger.error("%s: %s", message, error, extra=kwargs)
         else:
             self.logger.error(message, extra=kwargs)
     
     def log_warning(self, message: str, **kwargs):
         """Log warning message"""
-        self.logger.warning(message, extra=kwargs)
+        if self.logger.isEnabledFor(logging.WARNING):
+            self.logger.warning(message, extra=kwargs)
     
     def handle_error(self, error: Exception, context: str = "") -> Dict[str, Any]:
         """Handle service errors consistently"""
         error_msg = f"Error in {context}: {str(error)}" if context else str(error)
-        self.log_error(error_msg, error)
+        
+        # Log context and error as arguments instead of re-formatting error_msg
+        if self.logger.isEnabledFor(logging.ERROR):
+            if context:
+                self.logger.error("Error in %s: %s", context, error)
+            else:
+                self.logger.error("%s", error)
         
         return {
             "success": False,
@@ -39,10 +92,9 @@ class BaseService(ABC):
     
     def success_response(self, data: Any = None, message: str = "Success") -> Dict[str, Any]:
         """Create success response"""
-        response = {
-            "success": True,
-            "message": message
-        }
+        response = _SUCCESS_TEMPLATE.copy()
+        if message != "Success":
+            response["message"] = message
         if data is not None:
             response["data"] = data
         return response
\ No newline at end of file
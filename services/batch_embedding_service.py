@@ -0,0 +1,225 @@
+"""
+Batch embedding service using the OpenAI Batch API for bulk ingestion
+"""
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from openai import OpenAI
+
+from services.base_service import BaseService
+from config import config, get_embedding_params, get_embedding_model_key
+from utils.embedding_tokens import truncate_embedding_input
+
+class BatchEmbeddingService(BaseService):
+    """Service for embedding large chunk sets through the OpenAI Batch API"""
+    
+    def __init__(self, openai_client: Optional[OpenAI] = None):
+        super().__init__()
+        self.openai_client = openai_client or OpenAI(api_key=config.OPENAI_API_KEY)
+        self.batch_path = Path(config.VECTOR_DB_PATH) / "batches"
+        self.batch_path.mkdir(parents=True, exist_ok=True)
+        self.state_file = self.batch_path / "batch_state.json"
+    
+    def _load_state(self) -> Dict[str, Any]:
+        """Load the submitted batches state file"""
+        if not self.state_file.exists():
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.log_warning(f"Could not read batch state file: {str(e)}")
+            return {}
+    
+    def _save_state(self, state: Dict[str, Any]):
+        """Persist the submitted batches state file"""
+        tmp_file = self.state_file.with_suffix(".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        tmp_file.replace(self.state_file)
+    
+    def _job_key(self, texts: List[str]) -> str:
+        """Build a stable job key from the embedding model and texts"""
+        model_key = get_embedding_model_key(config.OPENAI_EMBEDDING_MODEL, config.OPENAI_EMBEDDING_DIMS)
+        digest = hashlib.sha256(model_key.encode())
+        for text in texts:
+            digest.update(b"\x00")
+            digest.update(text.encode("utf-8"))
+        return digest.hexdigest()[:32]
+    
+    def submit_embeddings(self, job_id: str, texts: List[str]) -> str:
+        """
+        Submit texts to the OpenAI Batch API for embedding
+        
+        Args:
+            job_id: Job key identifying the texts
+            texts: List of text strings to embed
+        
+        Returns:
+            OpenAI batch ID
+        """
+        # Write one embeddings request per text
+        input_path = self.batch_path / f"{job_id}.jsonl"
+        embedding_params = get_embedding_params(config.OPENAI_EMBEDDING_MODEL, config.OPENAI_EMBEDDING_DIMS)
+        with open(input_path, 'w', encoding='utf-8') as f:
+            for i, text in enumerate(texts):
+                request = {
+                    "custom_id": f"chunk-{i}",
+                    "method": "POST",
+                    "url": "/v1/embeddings",
+                    "body": {**embedding_params, "input": truncate_embedding_input(text)}
+                }
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        
+        try:
+            with open(input_path, 'rb') as f:
+                input_file = self.openai_client.files.create(file=f, purpose="batch")
+        finally:
+            input_path.unlink()
+        
+        batch = self.openai_client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/embeddings",
+            completion_window="24h",
+            metadata={"job_id": job_id}
+        )
+        
+        # Track the batch so an interrupted ingestion can be resumed
+        state = self._load_state()
+        state[job_id] = {
+            "batch_id": batch.id,
+            "input_file_id": input_file.id,
+            "count": len(texts),
+            "submitted_at": time.time()
+        }
+        self._save_state(state)
+        
+        self.log_info(f"Submitted batch {batch.id} with {len(texts)} texts for job {job_id}")
+        return batch.id
+    
+    def wait_for_batch(self, batch_id: str, max_wait: int = 0):
+        """
+        Poll a batch until it finishes
+        
+        Args:
+            batch_id: OpenAI batch ID
+            max_wait: Seconds to wait before giving up (0 waits indefinitely)
+        
+        Returns:
+            Completed batch object
+        
+        Raises:
+            TimeoutError: If the batch is still running after max_wait seconds
+        """
+        deadline = time.monotonic() + max_wait if max_wait > 0 else None
+        while True:
+            batch = self.openai_client.batches.retrieve(batch_id)
+            
+            if batch.status == "completed":
+                return batch
+            if batch.status in ("failed", "expired", "cancelled", "cancelling"):
+                raise Exception(f"Batch {batch_id} finished with status {batch.status}")
+            
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Batch {batch_id} still {batch.status} after {max_wait}s")
+            
+            self.log_info(f"Batch {batch_id} status: {batch.status}")
+            time.sleep(config.OPENAI_BATCH_POLL_INTERVAL)
+    
+    def collect_embeddings(self, batch, count: int) -> List[List[float]]:
+        """
+        Download the output of a completed batch
+        
+        Args:
+            batch: Completed batch object
+            count: Number of texts submitted in the batch
+        
+        Returns:
+            List of embedding vectors in submission order
+        """
+        if not batch.output_file_id:
+            raise Exception(f"Batch {batch.id} has no output file")
+        
+        output = self.openai_client.files.content(batch.output_file_id).text
+        
+        embeddings: List[Optional[List[float]]] = [None] * count
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                raise Exception(f"Batch request {result.get('custom_id')} failed: {result.get('error')}")
+            
+            index = int(result["custom_id"].split("-", 1)[1])
+            embeddings[index] = response["body"]["data"][0]["embedding"]
+        
+        missing = sum(1 for embedding in embeddings if embedding is None)
+        if missing:
+            raise Exception(f"Batch {batch.id} is missing {missing} embeddings")
+        
+        return embeddings
+    
+    def cancel_batch(self, job_id: str, batch_id: str):
+        """Cancel a running batch and forget it in the state file"""
+        try:
+            self.openai_client.batches.cancel(batch_id)
+        except Exception as e:
+            self.log_warning(f"Could not cancel batch {batch_id}: {str(e)}")
+        
+        self._forget_job(job_id)
+    
+    def _forget_job(self, job_id: str):
+        """Drop a job from the state file so later ingestions submit a new batch"""
+        state = self._load_state()
+        if state.pop(job_id, None) is not None:
+            self._save_state(state)
+    
+    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts through the Batch API, resuming a previously submitted batch
+        
+        Args:
+            texts: List of text strings to embed
+        
+        Returns:
+            List of embedding vectors in the same order as texts
+        """
+        try:
+            if not texts:
+                return []
+            
+            # Resume an existing batch for the same texts if one was already submitted
+            job_id = self._job_key(texts)
+            job_state = self._load_state().get(job_id)
+            if job_state and job_state.get("count") == len(texts):
+                batch_id = job_state["batch_id"]
+                self.log_info(f"Resuming batch {batch_id} for job {job_id}")
+            else:
+                batch_id = self.submit_embeddings(job_id, texts)
+            
+            try:
+                batch = self.wait_for_batch(batch_id, config.OPENAI_BATCH_MAX_WAIT)
+                embeddings = self.collect_embeddings(batch, len(texts))
+            except TimeoutError:
+                # The caller embeds the texts another way, so the batch would only add cost
+                self.cancel_batch(job_id, batch_id)
+                raise
+            except Exception:
+                # A failed, expired or incomplete batch must not be resumed by the next ingestion
+                self._forget_job(job_id)
+                raise
+            
+            # Job finished, drop it from the state file
+            self._forget_job(job_id)
+            
+            self.log_info(f"Created {len(embeddings)} embeddings via batch {batch_id}")
+            return embeddings
+        
+        except Exception as e:
+            self.log_error(f"Error creating batch embeddings: {str(e)}")
+            raise
@@ -2,31 +2,80 @@
 Document service for file upload, validation and storage
 """
 import os
+import json
 import shutil
+import asyncio
+import tempfile
+from functools import cached_property
+from io import BytesIO
 from pathlib import Path
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, Union, BinaryIO
 from datetime import datetime
 
 from services.base_service import BaseService
 from services.text_extraction_service import TextExtractionService
 from services.vector_service import VectorService
 from services.query_service import QueryService
-from models.document import Document, DocumentStatus, FileType
+from models.document import Document, DocumentStatus, FILE_TYPE_MAP, SECTION_LIST_ADAPTER
 from utils.file_utils import (
     validate_file_type, validate_file_size, get_file_hash,
-    ensure_upload_directory, generate_safe_filename, get_file_info
+    ensure_upload_directory, generate_safe_filename, get_file_info,
+    get_stream_size, copy_stream_with_hash
 )
 from config import config
 
+def _is_stored_upload(name: str) -> bool:
+    """Check that a file in the upload directory is a stored document, not the hash index or an in-flight upload"""
+    return not name.startswith(".") and not name.endswith(".upload")
+
 class DocumentService(BaseService):
     """Service for document management"""
     
     def __init__(self):
         super().__init__()
         self.upload_path = ensure_upload_directory()
-        self.text_extraction_service = TextExtractionService()
-        self.vector_service = VectorService()
-        self.query_service = QueryService()
+        
+        # Upload directory resolved once, so stored paths are built by string concatenation
+        self._upload_prefix = str(self.upload_path) + os.sep
+        
+        # Document ID -> stored file path string, filled on upload and on lookup
+        self._path_index: Dict[str, str] = {}
+        
+        # File hash -> stored upload data, persisted next to the uploads
+        self._hash_index_file = self.upload_path / ".hash_index.json"
+        self._hash_index: Dict[str, Dict[str, Any]] = self._load_hash_index()
+    
+    # Downstream services are built on first use, so upload-only flows never open ChromaDB or OpenAI clients
+    @cached_property
+    def text_extraction_service(self) -> TextExtractionService:
+        return TextExtractionService()
+    
+    @cached_property
+    def vector_service(self) -> VectorService:
+        return VectorService()
+    
+    @cached_property
+    def query_service(self) -> QueryService:
+        # Shares the vector service so its answer cache hears about vector changes made here
+        return QueryService(self.vector_service)
+    
+    def _load_hash_index(self) -> Dict[str, Dict[str, Any]]:
+        """Load the file hash index sidecar file"""
+        if not self._hash_index_file.exists():
+            return {}
+        try:
+            with open(self._hash_index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.log_warning(f"Could not read hash index file: {str(e)}")
+            return {}
+    
+    def _save_hash_index(self):
+        """Persist the file hash index sidecar file"""
+        tmp_file = self._hash_index_file.with_suffix(".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._hash_index, f)
+        tmp_file.replace(self._hash_index_file)
     
     def validate_file(self, filename: str, file_size: int) -> Tuple[bool, Optional[str], Dict[str, Any]]:
         """
@@ -44,12 +93,12 @@ class DocumentService(BaseService):
         except Exception as e:
             return False, f"Erro na validação do arquivo: {str(e)}", {}
     
-    def upload_document(self, file_content: bytes, filename: str, user_id: str = "default_user") -> Dict[str, Any]:
+    def upload_document(self, file_content: Union[bytes, BinaryIO], filename: str, user_id: str = "default_user") -> Dict[str, Any]:
         """
         Upload and store document
         
         Args:
-            file_content: File content as bytes
+            file_content: File content as bytes or a binary file-like object
             filename: Original filename
             user_id: User identifier
             
@@ -57,51 +106,68 @@ class DocumentService(BaseService):
             Dictionary with upload result
         """
         try:
+            # Wrap raw bytes so both inputs are streamed to disk the same way
+            if isinstance(file_content, (bytes, bytearray)):
+                file_content = BytesIO(file_content)
+            
             # Validate file
-            file_size = len(file_content)
+            file_size = get_stream_size(file_content)
             is_valid, error_msg, file_info = self.validate_file(filename, file_size)
             
             if not is_valid:
                 self.log_error(f"File validation failed: {error_msg}")
                 return self.handle_error(Exception(error_msg), "file validation")
             
-            # Generate file hash and safe filename
-            file_hash = get_file_hash(file_content)
+            # Stream file to a temporary file, hashing it in the same pass
+            fd, tmp_name = tempfile.mkstemp(dir=self._upload_prefix, suffix=".upload")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    file_hash, _ = copy_stream_with_hash(file_content, f)
+            except Exception:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+            
+            # Known content is served from the hash index, skipping the rename and a new document
+            existing_doc = self._find_existing_document(file_hash)
+            if existing_doc:
+                os.unlink(tmp_name)
+                self.log_warning(f"File already exists: {existing_doc['safe_filename']}")
+                return self.success_response(
+                    data=existing_doc,
+                    message="Arquivo já existe no sistema"
+                )
+            
+            # Generate safe filename from the hash
             safe_filename = generate_safe_filename(filename, file_hash)
             
             # Create document model
             document = Document(
                 user_id=user_id,
                 filename=filename,
-                file_type=FileType(file_info["extension"]),
+                file_type=FILE_TYPE_MAP[file_info["extension"]],
                 file_size=file_size,
                 status=DocumentStatus.UPLOADED
             )
             
-            # Save file to disk
-            file_path = self.upload_path / safe_filename
-            
-            # Check if file already exists (duplicate detection)
-            if file_path.exists():
-                self.log_warning(f"File already exists: {safe_filename}")
-                # Load existing document info if available
-                existing_doc = self._find_existing_document(file_hash)
-                if existing_doc:
-                    return self.success_response(
-                        data=existing_doc.model_dump(),
-                        message="Arquivo já existe no sistema"
-                    )
+            # Move the fully written file into place
+            file_path = self._upload_prefix + safe_filename
+            os.replace(tmp_name, file_path)
             
-            # Write file to disk
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
+            self._path_index[document.id] = file_path
+            self._hash_index[file_hash] = {
+                "document": document.model_dump(mode="json"),
+                "file_path": file_path,
+                "safe_filename": safe_filename
+            }
+            self._save_hash_index()
             
             self.log_info(f"Document uploaded successfully: {document.id}")
             
             return self.success_response(
                 data={
                     "document": document.model_dump(),
-                    "file_path": str(file_path),
+                    "document_model": document,
+                    "file_path": file_path,
                     "file_hash": file_hash,
                     "safe_filename": safe_filename
                 },
@@ -123,10 +189,27 @@ class DocumentService(BaseService):
             Path object or None if not found
         """
         try:
+            # Known path from upload or a previous lookup
+            file_path = self._path_index.get(document_id)
+            if file_path and os.path.isfile(file_path):
+                return Path(file_path)
+            
+            # Safe filenames are stored as-is, so try the direct path before scanning
+            if filename and _is_stored_upload(filename):
+                file_path = self._upload_prefix + filename
+                if os.path.isfile(file_path):
+                    self._path_index[document_id] = file_path
+                    return Path(file_path)
+            
             # Look for files that contain the document_id or match the filename pattern
-            for file_path in self.upload_path.glob("*"):
-                if document_id[:8] in file_path.name or filename in file_path.name:
-                    return file_path
+            id_prefix = document_id[:8]
+            with os.scandir(self.upload_path) as entries:
+                for entry in entries:
+                    if not _is_stored_upload(entry.name):
+                        continue
+                    if (id_prefix and id_prefix in entry.name) or (filename and filename in entry.name):
+                        self._path_index[document_id] = entry.path
+                        return Path(entry.path)
             return None
         except Exception as e:
             self.log_error(f"Error finding document path: {str(e)}")
@@ -154,6 +237,17 @@ class DocumentService(BaseService):
             
             # Delete file
             file_path.unlink()
+            self._path_index.pop(document_id, None)
+            
+            # Forget the hash so the same content can be uploaded again
+            stale_hashes = [
+                file_hash for file_hash, entry in self._hash_index.items()
+                if entry["document"].get("id") == document_id or entry["file_path"] == str(file_path)
+            ]
+            if stale_hashes:
+                for file_hash in stale_hashes:
+                    del self._hash_index[file_hash]
+                self._save_hash_index()
             
             self.log_info(f"Document deleted successfully: {document_id}")
             return self.success_response(message="Arquivo deletado com sucesso")
@@ -181,7 +275,7 @@ class DocumentService(BaseService):
         except Exception as e:
             return self.handle_error(e, "get document info")
     
-    def _find_existing_document(self, file_hash: str) -> Optional[Document]:
+    def _find_existing_document(self, file_hash: str) -> Optional[Dict[str, Any]]:
         """
         Find existing document by file hash
         
@@ -189,11 +283,29 @@ class DocumentService(BaseService):
             file_hash: File hash to search for
             
         Returns:
-            Document object if found, None otherwise
+            Upload data of the existing document if found, None otherwise
         """
-        # This would typically query a database
-        # For now, return None (no duplicates found)
-        return None
+        entry = self._hash_index.get(file_hash)
+        if not entry:
+            return None
+        
+        # Drop entries whose file was removed outside the service
+        file_path = entry["file_path"]
+        if not os.path.isfile(file_path):
+            del self._hash_index[file_hash]
+            self._save_hash_index()
+            return None
+        
+        document = Document.model_validate(entry["document"])
+        self._path_index[document.id] = file_path
+        
+        return {
+            "document": document.model_dump(),
+            "document_model": document,
+            "file_path": file_path,
+            "file_hash": file_hash,
+            "safe_filename": entry["safe_filename"]
+        }
     
     def list_documents(self, user_id: str = "default_user") -> Dict[str, Any]:
         """
@@ -206,17 +318,19 @@ class DocumentService(BaseService):
             Dictionary with list of documents
         """
         try:
-            # Get all files in upload directory
+            # Get all files in upload directory (scandir entries cache type and stat info)
             files = []
-            for file_path in self.upload_path.glob("*"):
-                if file_path.is_file():
-                    stat = file_path.stat()
-                    files.append({
-                        "filename": file_path.name,
-                        "size": stat.st_size,
-                        "modified": datetime.fromtimestamp(stat.st_mtime),
-                        "path": str(file_path)
-                    })
+            with os.scandir(self.upload_path) as entries:
+                for entry in entries:
+                    # Skip the hash index sidecar and in-flight uploads
+                    if entry.is_file() and _is_stored_upload(entry.name):
+                        stat = entry.stat()
+                        files.append({
+                            "filename": entry.name,
+                            "size": stat.st_size,
+                            "modified": datetime.fromtimestamp(stat.st_mtime),
+                            "path": entry.path
+                        })
             
             return self.success_response(
                 data={"files": files, "count": len(files)},
@@ -226,6 +340,73 @@ class DocumentService(BaseService):
         except Exception as e:
             return self.handle_error(e, "list documents")
     
+    def _get_document(self, document_data: Dict[str, Any]) -> Document:
+        """
+        Get the Document for upload data, reusing the model instance when present
+        
+        Args:
+            document_data: Document data from upload
+            
+        Returns:
+            Document object
+        """
+        document = document_data.get("document_model")
+        if isinstance(document, Document):
+            return document
+        
+        # Rebuild from the dumped dict (already validated on upload), dropping any stale vector_ids field
+        doc_dict = {key: value for key, value in document_data["document"].items() if key != "vector_ids"}
+        document = Document.model_construct(**doc_dict)
+        
+        # Keep it so text extraction and vectorization share one instance
+        document_data["document_model"] = document
+        return document
+    
+    def _extract_document_text(self, document_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extract and chunk the text of an uploaded document
+        
+        Args:
+            document_data: Document data from upload
+            
+        Returns:
+            Result of the text extraction service
+        """
+        # Get document info
+        document = self._get_document(document_data)
+        file_path = Path(document_data["file_path"])
+        
+        # Update document status to processing
+        document.status = DocumentStatus.PROCESSING
+        
+        # Extract text using text extraction service
+        return self.text_extraction_service.process_document(document, file_path)
+    
+    def _build_text_response(self, processed_data: Dict[str, Any], contract_info_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine extracted text and contract information
+        
+        Args:
+            processed_data: Processed document from the text extraction service
+            contract_info_result: Result of the contract information extraction
+            
+        Returns:
+            Dictionary with processing result including extracted text
+        """
+        # Combine all results
+        final_result = {
+            "document": processed_data,
+            "contract_info": contract_info_result["data"] if contract_info_result["success"] else {},
+            "processing_stats": processed_data["stats"]
+        }
+        
+        self.log_info(f"Document text processing completed: {processed_data['id']}")
+        
+        return self.success_response(
+            data=final_result,
+            message="Texto extraído e processado com sucesso"
+        )
+    
     def process_document_text(self, document_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Process document to extract text content
@@ -237,15 +418,7 @@ class DocumentService(BaseService):
             Dictionary with processing result including extracted text
         """
         try:
-            # Get document info
-            document = Document(**document_data["document"])
-            file_path = Path(document_data["file_path"])
-            
-            # Update document status to processing
-            document.status = DocumentStatus.PROCESSING
-            
-            # Extract text using text extraction service
-            processing_result = self.text_extraction_service.process_document(document, file_path)
+            processing_result = self._extract_document_text(document_data)
             
             if not processing_result["success"]:
                 return processing_result
@@ -258,23 +431,83 @@ class DocumentService(BaseService):
                 processed_data["text_content"]
             )
             
-            # Combine all results
-            final_result = {
-                "document": processed_data,
-                "contract_info": contract_info_result["data"] if contract_info_result["success"] else {},
-                "processing_stats": processed_data["stats"]
-            }
-            
-            self.log_info(f"Document text processing completed: {document.id}")
-            
-            return self.success_response(
-                data=final_result,
-                message="Texto extraído e processado com sucesso"
-            )
+            return self._build_text_response(processed_data, contract_info_result)
             
         except Exception as e:
             return self.handle_error(e, "document text processing")
     
+    def _prepare_vectorization(self, document_data: Dict[str, Any], document_dict: Dict[str, Any]) -> Tuple[Document, list]:
+        """
+        Build the Document and chunk objects needed for vector storage
+        
+        Args:
+            document_data: Document data from upload
+            document_dict: Processed document from the text extraction service
+            
+        Returns:
+            Tuple of (document, chunks)
+        """
+        # Reuse the Document object from upload
+        original_document = self._get_document(document_data)
+        
+        # Update with processed data
+        original_document.status = DocumentStatus.READY
+        original_document.text_content = document_dict.get("text_content", "")
+        
+        # Hand the extractor's DocumentSection list straight to the vector store, kept out of the returned result
+        chunks = document_dict.pop("chunk_models", None)
+        if chunks is None:
+            # Convert chunks data back to DocumentSection objects (validated as one list, faster than per-item construction)
+            chunks = SECTION_LIST_ADAPTER.validate_python(document_dict["chunks"])
+        
+        return original_document, chunks
+    
+    def _use_batch_api(self, chunks: list) -> bool:
+        """Check if chunks should be embedded through the OpenAI Batch API"""
+        return config.OPENAI_BATCH_ENABLED and len(chunks) > config.OPENAI_BATCH_THRESHOLD
+    
+    def _build_complete_response(self, document: Document, text_result: Dict[str, Any], vector_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine text extraction and vector storage results
+        
+        Args:
+            document: Processed document
+            text_result: Successful result of process_document_text
+            vector_result: Result of the vector storage step
+            
+        Returns:
+            Dictionary with complete processing result
+        """
+        if not vector_result["success"]:
+            self.log_warning(f"Vector storage failed: {vector_result['error']}")
+            vector_info = {"vectors_stored": False, "error": vector_result["error"]}
+        elif vector_result["data"].get("status") == "queued":
+            vector_info = {
+                "vectors_stored": False,
+                "vectors_queued": True,
+                "chunks_queued": vector_result["data"]["queued_count"]
+            }
+        else:
+            vector_info = {
+                "vectors_stored": True,
+                "chunks_vectorized": vector_result["data"]["stored_count"]
+            }
+        
+        # Combine all results
+        complete_result = {
+            "document": text_result["data"]["document"],
+            "contract_info": text_result["data"]["contract_info"],
+            "processing_stats": text_result["data"]["processing_stats"],
+            "vector_info": vector_info
+        }
+        
+        self.log_info(f"Complete document processing finished: {document.id}")
+        
+        return self.success_response(
+            data=complete_result,
+            message="Documento processado e vetorizado com sucesso"
+        )
+    
     def process_document_complete(self, document_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Complete document processing: text extraction + vectorization
@@ -292,59 +525,62 @@ class DocumentService(BaseService):
             if not text_result["success"]:
                 return text_result
             
-            # Get document and chunks for vectorization
-            document_dict = text_result["data"]["document"]
+            original_document, chunks = self._prepare_vectorization(document_data, text_result["data"]["document"])
             
-            # Create Document object with original data from upload
-            original_doc_data = document_data["document"].copy()
-            
-            # Remove any problematic vector_ids field
-            if "vector_ids" in original_doc_data:
-                del original_doc_data["vector_ids"]
+            # Store vectors in ChromaDB
+            if self._use_batch_api(chunks):
+                vector_result = self.vector_service.store_document_chunks_batch(original_document, chunks)
+            else:
+                vector_result = self.vector_service.store_document_chunks(original_document, chunks)
             
-            original_document = Document(**original_doc_data)
+            return self._build_complete_response(original_document, text_result, vector_result)
             
-            # Update with processed data
-            original_document.status = DocumentStatus.READY
-            original_document.text_content = document_dict.get("text_content", "")
+        except Exception as e:
+            return self.handle_error(e, "complete document processing")
+    
+    async def aprocess_document_complete(self, document_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Complete document processing with concurrent chunk embedding
+        
+        Args:
+            document_data: Document data from upload
             
-            chunks_data = document_dict["chunks"]
+        Returns:
+            Dictionary with complete processing result
+        """
+        try:
+            # First, process text extraction off the event loop
+            processing_result = await asyncio.to_thread(self._extract_document_text, document_data)
             
-            # Convert chunks data back to DocumentSection objects
-            from models.document import DocumentSection
-            chunks = [DocumentSection(**chunk_data) for chunk_data in chunks_data]
+            if not processing_result["success"]:
+                return processing_result
             
-            # Store vectors in ChromaDB
-            vector_result = self.vector_service.store_document_chunks(original_document, chunks)
+            processed_data = processing_result["data"]
+            original_document, chunks = self._prepare_vectorization(document_data, processed_data)
             
-            if not vector_result["success"]:
-                self.log_warning(f"Vector storage failed: {vector_result['error']}")
-                vector_info = {"vectors_stored": False, "error": vector_result["error"]}
+            # Store vectors in ChromaDB, embedding batches concurrently
+            if self._use_batch_api(chunks):
+                vector_task = asyncio.to_thread(
+                    self.vector_service.store_document_chunks_batch, original_document, chunks
+                )
             else:
-                vector_info = {
-                    "vectors_stored": True,
-                    "chunks_vectorized": vector_result["data"]["stored_count"]
-                }
-            
-            # Combine all results
-            complete_result = {
-                "document": text_result["data"]["document"],
-                "contract_info": text_result["data"]["contract_info"],
-                "processing_stats": text_result["data"]["processing_stats"],
-                "vector_info": vector_info
-            }
-            
-            self.log_info(f"Complete document processing finished: {original_document.id}")
-            
-            return self.success_response(
-                data=complete_result,
-                message="Documento processado e vetorizado com sucesso"
+                vector_task = self.vector_service.astore_document_chunks(original_document, chunks)
+            
+            # Contract information only reads the extracted text, so it runs while the chunks are embedded
+            contract_info_result, vector_result = await asyncio.gather(
+                asyncio.to_thread(
+                    self.text_extraction_service.extract_contract_specific_info, processed_data["text_content"]
+                ),
+                vector_task
             )
             
+            text_result = self._build_text_response(processed_data, contract_info_result)
+            return self._build_complete_response(original_document, text_result, vector_result)
+            
         except Exception as e:
             return self.handle_error(e, "complete document processing")
     
-    def search_document(self, document_id: str, query: str, top_k: int = 5) -> Dict[str, Any]:
+    def search_document(self, document_id: str, query: str, top_k: int = 5, min_similarity: float = 0.0) -> Dict[str, Any]:
         """
         Search within a specific document using semantic search
         
@@ -352,6 +588,7 @@ class DocumentService(BaseService):
             document_id: Document ID to search within
             query: Search query
             top_k: Number of results to return
+            min_similarity: Minimum relevance score for returned results
             
         Returns:
             Dictionary with search results
@@ -360,12 +597,14 @@ class DocumentService(BaseService):
             return self.vector_service.semantic_search(
                 query=query,
                 document_id=document_id,
-                top_k=top_k
+                top_k=top_k,
+                min_similarity=min_similarity
             )
         except Exception as e:
             return self.handle_error(e, "document search")
     
-    def query_document(self, document_id: str, question: str, user_id: str = "default_user") -> Dict[str, Any]:
+    def query_document(self, document_id: str, question: str, user_id: str = "default_user",
+                       top_k: int = 5, min_similarity: float = 0.0) -> Dict[str, Any]:
         """
         Process a natural language query about a document using RAG
         
@@ -373,6 +612,8 @@ class DocumentService(BaseService):
             document_id: Document ID to query
             question: User's natural language question
             user_id: User identifier
+            top_k: Number of relevant chunks to retrieve
+            min_similarity: Minimum relevance score for a chunk to be used as context
             
         Returns:
             Dictionary with RAG response
@@ -381,7 +622,35 @@ class DocumentService(BaseService):
             return self.query_service.process_query(
                 question=question,
                 document_id=document_id,
-                user_id=user_id
+                user_id=user_id,
+                top_k=top_k,
+                min_similarity=min_similarity
+            )
+        except Exception as e:
+            return self.handle_error(e, "document query")
+    
+    def query_document_stream(self, document_id: str, question: str, user_id: str = "default_user",
+                              top_k: int = 5, min_similarity: float = 0.0) -> Dict[str, Any]:
+        """
+        Process a natural language query about a document using RAG, streaming the answer
+        
+        Args:
+            document_id: Document ID to query
+            question: User's natural language question
+            user_id: User identifier
+            top_k: Number of relevant chunks to retrieve
+            min_similarity: Minimum relevance score for a chunk to be used as context
+            
+        Returns:
+            Dictionary with RAG response; data holds an answer_stream generator when the LLM is used
+        """
+        try:
+            return self.query_service.process_query_stream(
+                question=question,
+                document_id=document_id,
+                user_id=user_id,
+                top_k=top_k,
+                min_similarity=min_similarity
             )
         except Exception as e:
             return self.handle_error(e, "document query")
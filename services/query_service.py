@@ -2,24 +2,210 @@
 Query service for RAG (Retrieval-Augmented Generation) functionality
 """
 import re
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
 
 from openai import OpenAI
 
 from services.base_service import BaseService
 from services.vector_service import VectorService
 from models.document import QueryResponse, DocumentSection
+from utils.semantic_cache import SemanticCache
 from config import config
 
+# Intent patterns, compiled once at import
+_INTENT_PATTERN_SOURCES = {
+    "sla_query": [
+        r'\bsla\b', r'tempo.*resposta', r'prazo.*atendimento', 
+        r'nivel.*serviço', r'disponibilidade', r'uptime'
+    ],
+    "fiber_query": [
+        r'\bfibra\b', r'\bkm\b', r'quilometr', r'extensão', 
+        r'rede', r'cabo', r'infraestrutura'
+    ],
+    "penalty_query": [
+        r'\bmulta\b', r'penalidade', r'sanção', r'valor.*multa',
+        r'descumprimento', r'infração'
+    ],
+    "duration_query": [
+        r'\bprazo\b', r'vigência', r'duração', r'período',
+        r'renovação', r'vencimento', r'término'
+    ],
+    "contract_info": [
+        r'número.*contrato', r'contrato.*n', r'identificação',
+        r'partes', r'contratante', r'contratada'
+    ]
+}
+# Flat (intent, pattern) pairs scanned in one pass, grouped by intent
+_INTENT_PATTERNS = tuple(
+    (intent_type, re.compile(pattern))
+    for intent_type, patterns in _INTENT_PATTERN_SOURCES.items()
+    for pattern in patterns
+)
+_INTENT_PATTERN_COUNTS = {
+    intent_type: len(patterns) for intent_type, patterns in _INTENT_PATTERN_SOURCES.items()
+}
+# Literals at least one of which every intent pattern needs to match, so questions
+# without any of them skip the regex scan
+_INTENT_ANCHORS = (
+    'sla', 'tempo', 'prazo', 'nivel', 'disponibilidade', 'uptime',
+    'fibra', 'km', 'quilometr', 'extensão', 'rede', 'cabo', 'infraestrutura',
+    'multa', 'penalidade', 'sanção', 'descumprimento', 'infração',
+    'vigência', 'duração', 'período', 'renovação', 'vencimento', 'término',
+    'número', 'contrat', 'identificação', 'partes'
+)
+
+# Entity extraction patterns
+_NUMBER_PATTERN = re.compile(r'\b\d+(?:[.,]\d+)?\b')
+_TIME_UNIT_PATTERN = re.compile(r'\b\d+\s*(horas?|dias?|meses?|anos?|minutos?)\b')
+_MONETARY_PATTERN = re.compile(r'R\$\s*\d+(?:[.,]\d+)*')
+_CONTRACT_REF_PATTERN = re.compile(r'contrato\s*n?[°º]?\s*[\w\-/]+')
+# Numbers, time units and monetary values all contain a digit
+_DIGIT_PATTERN = re.compile(r'\d')
+
+# Question type keywords, checked in order
+_QUESTION_TYPE_KEYWORDS = (
+    ("what", ('qual', 'quais', 'que', 'o que')),
+    ("how_much", ('quanto', 'quantos', 'quantas')),
+    ("when", ('quando', 'que horas', 'que dia')),
+    ("where", ('onde', 'em que local')),
+    ("how", ('como', 'de que forma')),
+    ("why", ('por que', 'porque', 'motivo'))
+)
+# One substring alternation per question type, keeping the keyword check order
+_QUESTION_TYPE_PATTERNS = tuple(
+    (question_type, re.compile("|".join(re.escape(word) for word in keywords)))
+    for question_type, keywords in _QUESTION_TYPE_KEYWORDS
+)
+
+# Suggested questions, returned as-is by every suggestions request, so callers must not modify them
+_QUERY_SUGGESTIONS = {
+    "sla_questions": [
+        "Qual o tempo de SLA definido no contrato?",
+        "Quais são os prazos de atendimento para incidentes?",
+        "Qual o nível de disponibilidade garantido?"
+    ],
+    "fiber_questions": [
+        "Quantos quilômetros de fibra óptica estão inclusos?",
+        "Qual a extensão da rede contratada?",
+        "Quais as especificações técnicas da fibra?"
+    ],
+    "penalty_questions": [
+        "Qual o valor da multa por descumprimento?",
+        "Quais são as penalidades previstas?",
+        "Em que situações se aplicam multas?"
+    ],
+    "duration_questions": [
+        "Qual o prazo de vigência do contrato?",
+        "Quando o contrato pode ser renovado?",
+        "Qual a duração mínima do acordo?"
+    ],
+    "general_questions": [
+        "Qual o número do contrato?",
+        "Quem são as partes contratantes?",
+        "Quais os principais termos do acordo?"
+    ]
+}
+
+# Normalized suggested questions, answered from the search snippets when CANNED_QUERY_FALLBACK is on
+_CANNED_QUERIES = frozenset(
+    question.strip().lower()
+    for questions in _QUERY_SUGGESTIONS.values()
+    for question in questions
+)
+
+# Number of top search results used as LLM context and for the confidence score
+_CONTEXT_RESULTS = 3
+
+# Shared default for search results without metadata
+_EMPTY_METADATA: Dict[str, Any] = {}
+
+# Shared pool for running the vector search alongside intent analysis
+_search_executor: Optional[ThreadPoolExecutor] = None
+_search_executor_lock = threading.Lock()
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    """Create the shared search thread pool on first use"""
+    global _search_executor
+    
+    with _search_executor_lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-search")
+    
+    return _search_executor
+
+# System prompt shared by every query
+_BASE_SYSTEM_PROMPT = """Você é um assistente especializado em análise de contratos de operadoras de telecomunicações, com foco em:
+
+- Tempos de SLA (Service Level Agreement)
+- Extensão de fibra óptica em quilômetros
+- Valores de multas e penalidades
+- Prazos e vigência de contratos
+- Cláusulas de rescisão e renovação
+
+Instruções:
+1. Responda sempre em português brasileiro
+2. Base suas respostas EXCLUSIVAMENTE no contexto fornecido
+3. Seja preciso e objetivo
+4. Cite os trechos específicos quando relevante
+5. Se a informação não estiver no contexto, diga claramente
+6. Para valores monetários, mantenha o formato original (R$)
+7. Para prazos, seja específico (horas, dias, meses, anos)
+8. Destaque informações críticas como SLA e multas"""
+
+# Extra guidance appended to the system prompt for the primary intent
+_INTENT_PROMPT_FOCUS = {
+    "sla_query": "Foco especial: Esta pergunta é sobre SLA. Procure por tempos de resposta, prazos de atendimento e níveis de serviço.",
+    "fiber_query": "Foco especial: Esta pergunta é sobre fibra óptica. Procure por extensão em km, capacidade e especificações técnicas.",
+    "penalty_query": "Foco especial: Esta pergunta é sobre multas e penalidades. Procure por valores monetários e condições de aplicação.",
+    "duration_query": "Foco especial: Esta pergunta é sobre prazos e vigência. Procure por durações, datas de início/fim e condições de renovação."
+}
+
+@lru_cache(maxsize=8)
+def _system_prompt_for(intent: Optional[str]) -> str:
+    """Assemble the system prompt for a primary intent, built once per intent"""
+    focus = _INTENT_PROMPT_FOCUS.get(intent)
+    return f"{_BASE_SYSTEM_PROMPT}\n\n{focus}" if focus else _BASE_SYSTEM_PROMPT
+
+@lru_cache(maxsize=256)
+def _score_intents(question_lower: str) -> Tuple[Tuple[str, float], ...]:
+    """Score each intent for a lowercased question, cached for repeated queries"""
+    # Plain substring checks are much cheaper than the regex scan for off-topic questions
+    if not any(anchor in question_lower for anchor in _INTENT_ANCHORS):
+        return ()
+    
+    matches: Dict[str, int] = {}
+    for intent_type, pattern in _INTENT_PATTERNS:
+        if pattern.search(question_lower):
+            matches[intent_type] = matches.get(intent_type, 0) + 1
+    
+    # Boost confidence
+    return tuple(
+        (intent_type, min(1.0, count / _INTENT_PATTERN_COUNTS[intent_type] * 2))
+        for intent_type, count in matches.items()
+    )
+
 class QueryService(BaseService):
     """Service for processing natural language queries using RAG"""
     
-    def __init__(self):
+    def __init__(self, vector_service: Optional[VectorService] = None):
         super().__init__()
-        self.vector_service = VectorService()
+        self.vector_service = vector_service or VectorService()
         self.openai_client = None
         self._initialize_openai()
+        
+        # Answers to earlier, near-identical questions are served without calling the LLM
+        self.semantic_cache = None
+        if config.SEMANTIC_CACHE_ENABLED:
+            self.semantic_cache = SemanticCache(
+                threshold=config.SEMANTIC_CACHE_THRESHOLD,
+                max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES
+            )
+            # Answers go stale as soon as the document's vectors change
+            self.vector_service.add_change_listener(self.semantic_cache.invalidate)
     
     def _initialize_openai(self):
         """Initialize OpenAI client"""
@@ -32,7 +218,8 @@ class QueryService(BaseService):
         except Exception as e:
             self.log_error(f"Failed to initialize OpenAI client: {str(e)}")
     
-    def process_query(self, question: str, document_id: str, user_id: str = "default_user", top_k: int = 5) -> Dict[str, Any]:
+    def process_query(self, question: str, document_id: str, user_id: str = "default_user", top_k: int = 5,
+                      min_similarity: float = 0.0) -> Dict[str, Any]:
         """
         Process a natural language query using RAG
         
@@ -41,19 +228,22 @@ class QueryService(BaseService):
             document_id: Document ID to search within
             user_id: User identifier
             top_k: Number of relevant chunks to retrieve
+            min_similarity: Minimum relevance score for a chunk to be used as context
             
         Returns:
             Dictionary with RAG response
         """
         try:
-            # Step 1: Analyze query intent
-            intent_analysis = self.analyze_query_intent(question)
-            
-            # Step 2: Perform semantic search
-            search_result = self.vector_service.semantic_search(
-                query=question,
-                document_id=document_id,
-                top_k=top_k
+            # Step 1: Embed the question once for the answer cache and the search
+            query_embedding = self.vector_service.embed_query(question)
+            
+            cached = self._get_cached_answer(document_id, query_embedding, top_k, min_similarity)
+            if cached:
+                return self.success_response(data=cached, message="Consulta respondida a partir do cache")
+            
+            # Step 2: Analyze query intent while the semantic search runs
+            intent_analysis, search_result = self._search_with_intent(
+                question, document_id, top_k, min_similarity, query_embedding
             )
             
             if not search_result["success"]:
@@ -62,30 +252,12 @@ class QueryService(BaseService):
             search_results = search_result["data"]["results"]
             
             # Step 3: Generate response using LLM
-            if search_results and self.openai_client:
+            if search_results and self.openai_client and not self._is_canned_query(question):
                 response_result = self._generate_llm_response(question, search_results, intent_analysis)
-                
-                if response_result["success"]:
-                    # Create QueryResponse object
-                    query_response = QueryResponse(
-                        question=question,
-                        answer=response_result["data"]["answer"],
-                        sources=[self._result_to_document_section(result) for result in search_results],
-                        confidence_score=response_result["data"].get("confidence_score", 0.8)
-                    )
-                    
-                    return self.success_response(
-                        data={
-                            "query_response": query_response.model_dump(),
-                            "search_results": search_results,
-                            "intent_analysis": intent_analysis["data"] if intent_analysis["success"] else {},
-                            "total_results": len(search_results)
-                        },
-                        message="Consulta processada com sucesso usando RAG"
-                    )
-                else:
-                    # Fallback to search results only
-                    return self._create_fallback_response(question, search_results)
+                return self._build_rag_response(
+                    question, document_id, query_embedding, top_k, min_similarity,
+                    search_results, intent_analysis, response_result
+                )
             else:
                 # Fallback to search results only
                 return self._create_fallback_response(question, search_results)
@@ -93,41 +265,136 @@ class QueryService(BaseService):
         except Exception as e:
             return self.handle_error(e, "query processing")
     
-    def _generate_llm_response(self, question: str, search_results: List[Dict], intent_analysis: Dict) -> Dict[str, Any]:
+    def _build_rag_response(self, question: str, document_id: str, query_embedding: List[float], top_k: int,
+                            min_similarity: float, search_results: List[Dict], intent_analysis: Dict,
+                            response_result: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Generate response using LLM based on retrieved context
+        Build the RAG response for a generated answer, falling back to search results on LLM failure
         
         Args:
             question: User's question
+            document_id: Document ID the question is about
+            query_embedding: Embedding of the question
+            top_k: Number of relevant chunks retrieved
+            min_similarity: Minimum relevance score used for retrieval
             search_results: Retrieved relevant chunks
             intent_analysis: Query intent analysis
+            response_result: Result of the LLM response generation
             
         Returns:
-            Dictionary with LLM response
+            Dictionary with RAG response
         """
-        try:
-            # Prepare context from search results
-            context_chunks = []
-            for i, result in enumerate(search_results[:3], 1):  # Use top 3 results
-                relevance = result["relevance_score"]
-                content = result["content"]
-                metadata = result.get("metadata", {})
-                page_num = metadata.get("page_number", 0)
-                
-                chunk_info = f"[Trecho {i} - Relevância: {relevance:.1%}"
-                if page_num > 0:
-                    chunk_info += f" - Página {page_num}"
-                chunk_info += f"]\n{content}\n"
-                
-                context_chunks.append(chunk_info)
+        if not response_result["success"]:
+            # Fallback to search results only
+            return self._create_fallback_response(question, search_results)
+        
+        # Create QueryResponse object (fields come from this service, no need to revalidate)
+        query_response = QueryResponse.model_construct(
+            question=question,
+            answer=response_result["data"]["answer"],
+            sources=self._results_to_document_sections(search_results),
+            confidence_score=response_result["data"].get("confidence_score", 0.8)
+        )
+        
+        response_data = {
+            "query_response": query_response.model_dump(),
+            "search_results": search_results,
+            "intent_analysis": intent_analysis["data"] if intent_analysis["success"] else {},
+            "total_results": len(search_results)
+        }
+        self._cache_answer(document_id, query_embedding, top_k, min_similarity, response_data)
+        
+        return self.success_response(
+            data=response_data,
+            message="Consulta processada com sucesso usando RAG"
+        )
+    
+    def _search_with_intent(self, question: str, document_id: str, top_k: int, min_similarity: float,
+                            query_embedding: List[float]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Run the semantic search on a worker thread while the intent is analyzed
+        
+        Args:
+            question: User's question
+            document_id: Document ID to search within
+            top_k: Number of relevant chunks to retrieve
+            min_similarity: Minimum relevance score for a chunk to be used as context
+            query_embedding: Embedding of the question
             
-            context = "\n".join(context_chunks)
+        Returns:
+            Tuple of (intent analysis result, semantic search result)
+        """
+        search_future = _get_search_executor().submit(
+            self.vector_service.semantic_search,
+            query=question,
+            document_id=document_id,
+            top_k=top_k,
+            min_similarity=min_similarity,
+            query_embedding=query_embedding
+        )
+        
+        intent_analysis = self.analyze_query_intent(question)
+        
+        return intent_analysis, search_future.result()
+    
+    def _get_cached_answer(self, document_id: str, query_embedding: List[float], top_k: int,
+                           min_similarity: float) -> Optional[Dict[str, Any]]:
+        """
+        Look up the response data of a near-identical earlier question
+        
+        Args:
+            document_id: Document ID the question is about
+            query_embedding: Embedding of the question
+            top_k: Number of relevant chunks the answer was built from
+            min_similarity: Minimum relevance score of those chunks
             
-            # Create system prompt for contract analysis
-            system_prompt = self._create_system_prompt(intent_analysis)
+        Returns:
+            Cached response data, or None on a miss or when the cache is disabled
+        """
+        if not self.semantic_cache:
+            return None
+        
+        cached = self.semantic_cache.get(document_id, query_embedding, scope=f"{top_k}:{min_similarity}")
+        if cached:
+            self.log_info(f"Semantic cache hit for document {document_id}")
+        return cached
+    
+    def _cache_answer(self, document_id: str, query_embedding: List[float], top_k: int, min_similarity: float,
+                      response_data: Dict[str, Any]):
+        """Store the response data of an answered question in the semantic cache"""
+        if self.semantic_cache:
+            self.semantic_cache.put(document_id, query_embedding, response_data, scope=f"{top_k}:{min_similarity}")
+    
+    def _build_llm_messages(self, question: str, search_results: List[Dict], intent_analysis: Dict) -> List[Dict[str, str]]:
+        """
+        Build the chat messages for answering a question from retrieved context
+        
+        Args:
+            question: User's question
+            search_results: Retrieved relevant chunks
+            intent_analysis: Query intent analysis
             
-            # Create user prompt
-            user_prompt = f"""
+        Returns:
+            List of chat messages
+        """
+        # Prepare context from search results
+        context_chunks = []
+        for i, result in enumerate(search_results[:_CONTEXT_RESULTS], 1):  # Use top results
+            page_num = (result.get("metadata") or _EMPTY_METADATA).get("page_number", 0)
+            page_info = f" - Página {page_num}" if page_num > 0 else ""
+            
+            # One f-string per chunk, joined once below
+            context_chunks.append(
+                f"[Trecho {i} - Relevância: {result['relevance_score']:.1%}{page_info}]\n{result['content']}\n"
+            )
+        
+        context = "\n".join(context_chunks)
+        
+        # Create system prompt for contract analysis
+        system_prompt = self._create_system_prompt(intent_analysis)
+        
+        # Create user prompt
+        user_prompt = f"""
 Pergunta do usuário: {question}
 
 Contexto relevante do contrato:
@@ -137,14 +404,37 @@ Por favor, responda à pergunta baseando-se exclusivamente no contexto fornecido
 
 Inclua referências específicas aos trechos relevantes em sua resposta.
 """
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _calculate_confidence(self, search_results: List[Dict]) -> float:
+        """Calculate confidence score based on relevance scores of the top results"""
+        top_results = search_results[:_CONTEXT_RESULTS]
+        avg_relevance = sum(r["relevance_score"] for r in top_results) / len(top_results)
+        return min(0.95, avg_relevance * 1.1)  # Boost slightly but cap at 95%
+    
+    def _generate_llm_response(self, question: str, search_results: List[Dict], intent_analysis: Dict) -> Dict[str, Any]:
+        """
+        Generate response using LLM based on retrieved context
+        
+        Args:
+            question: User's question
+            search_results: Retrieved relevant chunks
+            intent_analysis: Query intent analysis
+            
+        Returns:
+            Dictionary with LLM response
+        """
+        try:
+            messages = self._build_llm_messages(question, search_results, intent_analysis)
             
             # Call OpenAI API
             response = self.openai_client.chat.completions.create(
                 model=config.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=messages,
                 temperature=0.3,  # Lower temperature for more factual responses
                 max_tokens=1000
             )
@@ -152,8 +442,7 @@ Inclua referências específicas aos trechos relevantes em sua resposta.
             answer = response.choices[0].message.content.strip()
             
             # Calculate confidence score based on relevance scores
-            avg_relevance = sum(r["relevance_score"] for r in search_results[:3]) / min(3, len(search_results))
-            confidence_score = min(0.95, avg_relevance * 1.1)  # Boost slightly but cap at 95%
+            confidence_score = self._calculate_confidence(search_results)
             
             self.log_info(f"LLM response generated successfully for query: {question[:50]}...")
             
@@ -161,7 +450,7 @@ Inclua referências específicas aos trechos relevantes em sua resposta.
                 data={
                     "answer": answer,
                     "confidence_score": confidence_score,
-                    "context_used": len(context_chunks)
+                    "context_used": min(_CONTEXT_RESULTS, len(search_results))
                 },
                 message="Resposta gerada com sucesso"
             )
@@ -169,61 +458,157 @@ Inclua referências específicas aos trechos relevantes em sua resposta.
         except Exception as e:
             return self.handle_error(e, "LLM response generation")
     
+    def _stream_llm_answer(self, question: str, messages: List[Dict[str, str]],
+                           on_complete: Optional[Callable[[str], None]] = None) -> Iterator[str]:
+        """
+        Stream answer tokens from the LLM as they are generated
+        
+        Args:
+            question: User's question
+            messages: Chat messages built from the retrieved context
+            on_complete: Called with the full answer once the stream finishes without errors
+            
+        Yields:
+            Answer text fragments
+        """
+        try:
+            stream = self.openai_client.chat.completions.create(
+                model=config.OPENAI_MODEL,
+                messages=messages,
+                temperature=0.3,  # Lower temperature for more factual responses
+                max_tokens=1000,
+                stream=True
+            )
+            
+            parts = []
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+            
+            self.log_info(f"LLM response streamed successfully for query: {question[:50]}...")
+            
+            if on_complete:
+                on_complete("".join(parts).strip())
+            
+        except Exception as e:
+            self.log_error(f"Error streaming LLM response: {str(e)}")
+            yield f"\n\n[Erro ao gerar resposta: {str(e)}]"
+    
+    def process_query_stream(self, question: str, document_id: str, user_id: str = "default_user", top_k: int = 5,
+                             min_similarity: float = 0.0) -> Dict[str, Any]:
+        """
+        Process a natural language query using RAG, streaming the LLM answer
+        
+        Args:
+            question: User's natural language question
+            document_id: Document ID to search within
+            user_id: User identifier
+            top_k: Number of relevant chunks to retrieve
+            min_similarity: Minimum relevance score for a chunk to be used as context
+            
+        Returns:
+            Dictionary with an answer_stream generator, or the fallback response when the LLM is unavailable
+        """
+        try:
+            # Step 1: Embed the question once for the answer cache and the search
+            query_embedding = self.vector_service.embed_query(question)
+            
+            cached = self._get_cached_answer(document_id, query_embedding, top_k, min_similarity)
+            if cached:
+                query_response = cached["query_response"]
+                return self.success_response(
+                    data={
+                        "answer_stream": iter((query_response["answer"],)),
+                        "confidence_score": query_response["confidence_score"],
+                        "search_results": cached["search_results"],
+                        "intent_analysis": cached["intent_analysis"],
+                        "total_results": cached["total_results"]
+                    },
+                    message="Consulta respondida a partir do cache"
+                )
+            
+            # Step 2: Analyze query intent while the semantic search runs
+            intent_analysis, search_result = self._search_with_intent(
+                question, document_id, top_k, min_similarity, query_embedding
+            )
+            
+            if not search_result["success"]:
+                return search_result
+            
+            search_results = search_result["data"]["results"]
+            
+            if not search_results or not self.openai_client or self._is_canned_query(question):
+                return self._create_fallback_response(question, search_results)
+            
+            # Step 3: Stream response from LLM
+            messages = self._build_llm_messages(question, search_results, intent_analysis)
+            confidence_score = self._calculate_confidence(search_results)
+            intent_data = intent_analysis["data"] if intent_analysis["success"] else {}
+            
+            def cache_streamed_answer(answer: str):
+                query_response = QueryResponse.model_construct(
+                    question=question,
+                    answer=answer,
+                    sources=self._results_to_document_sections(search_results),
+                    confidence_score=confidence_score
+                )
+                self._cache_answer(document_id, query_embedding, top_k, min_similarity, {
+                    "query_response": query_response.model_dump(),
+                    "search_results": search_results,
+                    "intent_analysis": intent_data,
+                    "total_results": len(search_results)
+                })
+            
+            return self.success_response(
+                data={
+                    "answer_stream": self._stream_llm_answer(question, messages, on_complete=cache_streamed_answer),
+                    "confidence_score": confidence_score,
+                    "search_results": search_results,
+                    "intent_analysis": intent_data,
+                    "total_results": len(search_results)
+                },
+                message="Consulta processada com sucesso usando RAG"
+            )
+            
+        except Exception as e:
+            return self.handle_error(e, "query processing")
+    
     def _create_system_prompt(self, intent_analysis: Dict) -> str:
         """Create system prompt based on query intent"""
-        base_prompt = """Você é um assistente especializado em análise de contratos de operadoras de telecomunicações, com foco em:
-
-- Tempos de SLA (Service Level Agreement)
-- Extensão de fibra óptica em quilômetros
-- Valores de multas e penalidades
-- Prazos e vigência de contratos
-- Cláusulas de rescisão e renovação
-
-Instruções:
-1. Responda sempre em português brasileiro
-2. Base suas respostas EXCLUSIVAMENTE no contexto fornecido
-3. Seja preciso e objetivo
-4. Cite os trechos específicos quando relevante
-5. Se a informação não estiver no contexto, diga claramente
-6. Para valores monetários, mantenha o formato original (R$)
-7. Para prazos, seja específico (horas, dias, meses, anos)
-8. Destaque informações críticas como SLA e multas"""
-        
-        # Add specific guidance based on intent
+        intent = None
         if intent_analysis.get("success") and intent_analysis.get("data"):
-            intent_data = intent_analysis["data"]
-            
-            if intent_data.get("intent_type") == "sla_query":
-                base_prompt += "\n\nFoco especial: Esta pergunta é sobre SLA. Procure por tempos de resposta, prazos de atendimento e níveis de serviço."
-            elif intent_data.get("intent_type") == "fiber_query":
-                base_prompt += "\n\nFoco especial: Esta pergunta é sobre fibra óptica. Procure por extensão em km, capacidade e especificações técnicas."
-            elif intent_data.get("intent_type") == "penalty_query":
-                base_prompt += "\n\nFoco especial: Esta pergunta é sobre multas e penalidades. Procure por valores monetários e condições de aplicação."
-            elif intent_data.get("intent_type") == "duration_query":
-                base_prompt += "\n\nFoco especial: Esta pergunta é sobre prazos e vigência. Procure por durações, datas de início/fim e condições de renovação."
+            intent = intent_analysis["data"].get("primary_intent")
         
-        return base_prompt
+        return _system_prompt_for(intent)
+    
+    def _is_canned_query(self, question: str) -> bool:
+        """Check whether a question is a suggested one to be answered without the LLM"""
+        return config.CANNED_QUERY_FALLBACK and question.strip().lower() in _CANNED_QUERIES
     
     def _create_fallback_response(self, question: str, search_results: List[Dict]) -> Dict[str, Any]:
         """Create fallback response when LLM is not available"""
         if search_results:
             # Create simple response based on search results
-            answer = f"Encontrei {len(search_results)} trecho(s) relevante(s) no documento:\n\n"
+            answer_parts = [f"Encontrei {len(search_results)} trecho(s) relevante(s) no documento:\n\n"]
             
-            for i, result in enumerate(search_results[:3], 1):
+            for i, result in enumerate(search_results[:_CONTEXT_RESULTS], 1):
                 relevance = result["relevance_score"]
                 content = result["content"][:200] + "..." if len(result["content"]) > 200 else result["content"]
-                answer += f"{i}. (Relevância: {relevance:.1%})\n{content}\n\n"
+                answer_parts.append(f"{i}. (Relevância: {relevance:.1%})\n{content}\n\n")
+            
+            answer = "".join(answer_parts)
             
-            confidence_score = max(r["relevance_score"] for r in search_results) if search_results else 0.5
+            # Results come back ranked by relevance, so the first one has the highest score
+            confidence_score = search_results[0]["relevance_score"]
         else:
             answer = "Não encontrei informações relevantes no documento para responder sua pergunta."
             confidence_score = 0.0
         
-        query_response = QueryResponse(
+        query_response = QueryResponse.model_construct(
             question=question,
             answer=answer,
-            sources=[self._result_to_document_section(result) for result in search_results],
+            sources=self._results_to_document_sections(search_results),
             confidence_score=confidence_score
         )
         
@@ -237,16 +622,20 @@ Instruções:
             message="Consulta processada usando busca semântica (sem LLM)"
         )
     
-    def _result_to_document_section(self, result: Dict) -> DocumentSection:
-        """Convert search result to DocumentSection"""
-        metadata = result.get("metadata", {})
+    def _results_to_document_sections(self, search_results: List[Dict]) -> List[DocumentSection]:
+        """Convert search results to DocumentSections in a single pass"""
+        construct = DocumentSection.model_construct
         
-        return DocumentSection(
-            content=result["content"],
-            page_number=metadata.get("page_number"),
-            section_id=metadata.get("chunk_id", "unknown"),
-            relevance_score=result["relevance_score"]
-        )
+        # Search results come from our own vector store, no need to revalidate
+        return [
+            construct(
+                content=result["content"],
+                page_number=(metadata := result.get("metadata") or _EMPTY_METADATA).get("page_number"),
+                section_id=metadata.get("chunk_id", "unknown"),
+                relevance_score=result["relevance_score"]
+            )
+            for result in search_results
+        ]
     
     def analyze_query_intent(self, question: str) -> Dict[str, Any]:
         """
@@ -259,61 +648,26 @@ Instruções:
             Dictionary with intent analysis
         """
         try:
+            # Lowercase once for intent scoring, entities and question type
             question_lower = question.lower()
             
-            # Define intent patterns
-            intent_patterns = {
-                "sla_query": [
-                    r'\bsla\b', r'tempo.*resposta', r'prazo.*atendimento', 
-                    r'nivel.*serviço', r'disponibilidade', r'uptime'
-                ],
-                "fiber_query": [
-                    r'\bfibra\b', r'\bkm\b', r'quilometr', r'extensão', 
-                    r'rede', r'cabo', r'infraestrutura'
-                ],
-                "penalty_query": [
-                    r'\bmulta\b', r'penalidade', r'sanção', r'valor.*multa',
-                    r'descumprimento', r'infração'
-                ],
-                "duration_query": [
-                    r'\bprazo\b', r'vigência', r'duração', r'período',
-                    r'renovação', r'vencimento', r'término'
-                ],
-                "contract_info": [
-                    r'número.*contrato', r'contrato.*n', r'identificação',
-                    r'partes', r'contratante', r'contratada'
-                ]
-            }
-            
             # Analyze intent
-            detected_intents = []
-            confidence_scores = {}
-            
-            for intent_type, patterns in intent_patterns.items():
-                matches = 0
-                for pattern in patterns:
-                    if re.search(pattern, question_lower):
-                        matches += 1
-                
-                if matches > 0:
-                    confidence = min(1.0, matches / len(patterns) * 2)  # Boost confidence
-                    detected_intents.append(intent_type)
-                    confidence_scores[intent_type] = confidence
+            intent_scores = _score_intents(question_lower)
+            confidence_scores = dict(intent_scores)
+            detected_intents = list(confidence_scores)
             
             # Determine primary intent
-            primary_intent = None
-            if detected_intents:
-                primary_intent = max(detected_intents, key=lambda x: confidence_scores[x])
+            primary_intent = max(intent_scores, key=itemgetter(1))[0] if intent_scores else None
             
             # Extract key entities
-            entities = self._extract_entities(question)
+            entities = self._extract_entities(question, question_lower)
             
             intent_data = {
                 "primary_intent": primary_intent,
                 "all_intents": detected_intents,
                 "confidence_scores": confidence_scores,
                 "entities": entities,
-                "question_type": self._classify_question_type(question)
+                "question_type": self._classify_question_type(question_lower)
             }
             
             return self.success_response(
@@ -324,8 +678,8 @@ Instruções:
         except Exception as e:
             return self.handle_error(e, "query intent analysis")
     
-    def _extract_entities(self, question: str) -> Dict[str, List[str]]:
-        """Extract entities from question"""
+    def _extract_entities(self, question: str, question_lower: str) -> Dict[str, List[str]]:
+        """Extract entities from question (monetary values keep the original case)"""
         entities = {
             "numbers": [],
             "time_units": [],
@@ -333,42 +687,29 @@ Instruções:
             "contract_refs": []
         }
         
-        # Extract numbers
-        numbers = re.findall(r'\b\d+(?:[.,]\d+)?\b', question)
-        entities["numbers"] = numbers
-        
-        # Extract time units
-        time_units = re.findall(r'\b\d+\s*(horas?|dias?|meses?|anos?|minutos?)\b', question.lower())
-        entities["time_units"] = time_units
-        
-        # Extract monetary values
-        monetary = re.findall(r'R\$\s*\d+(?:[.,]\d+)*', question)
-        entities["monetary_values"] = monetary
+        # Most questions have no digits, so one scan rules out the three numeric patterns
+        if _DIGIT_PATTERN.search(question):
+            # Extract numbers
+            entities["numbers"] = _NUMBER_PATTERN.findall(question)
+            
+            # Extract time units
+            entities["time_units"] = _TIME_UNIT_PATTERN.findall(question_lower)
+            
+            # Extract monetary values
+            entities["monetary_values"] = _MONETARY_PATTERN.findall(question)
         
         # Extract contract references
-        contract_refs = re.findall(r'contrato\s*n?[°º]?\s*[\w\-/]+', question.lower())
-        entities["contract_refs"] = contract_refs
+        if "contrato" in question_lower:
+            entities["contract_refs"] = _CONTRACT_REF_PATTERN.findall(question_lower)
         
         return entities
     
-    def _classify_question_type(self, question: str) -> str:
-        """Classify the type of question"""
-        question_lower = question.lower()
-        
-        if any(word in question_lower for word in ['qual', 'quais', 'que', 'o que']):
-            return "what"
-        elif any(word in question_lower for word in ['quanto', 'quantos', 'quantas']):
-            return "how_much"
-        elif any(word in question_lower for word in ['quando', 'que horas', 'que dia']):
-            return "when"
-        elif any(word in question_lower for word in ['onde', 'em que local']):
-            return "where"
-        elif any(word in question_lower for word in ['como', 'de que forma']):
-            return "how"
-        elif any(word in question_lower for word in ['por que', 'porque', 'motivo']):
-            return "why"
-        else:
-            return "general"
+    def _classify_question_type(self, question_lower: str) -> str:
+        """Classify the type of a lowercased question"""
+        for question_type, pattern in _QUESTION_TYPE_PATTERNS:
+            if pattern.search(question_lower):
+                return question_type
+        return "general"
     
     def get_query_suggestions(self, document_id: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -381,40 +722,10 @@ Instruções:
             Dictionary with query suggestions
         """
         try:
-            # Base suggestions for contract analysis
-            suggestions = {
-                "sla_questions": [
-                    "Qual o tempo de SLA definido no contrato?",
-                    "Quais são os prazos de atendimento para incidentes?",
-                    "Qual o nível de disponibilidade garantido?"
-                ],
-                "fiber_questions": [
-                    "Quantos quilômetros de fibra óptica estão inclusos?",
-                    "Qual a extensão da rede contratada?",
-                    "Quais as especificações técnicas da fibra?"
-                ],
-                "penalty_questions": [
-                    "Qual o valor da multa por descumprimento?",
-                    "Quais são as penalidades previstas?",
-                    "Em que situações se aplicam multas?"
-                ],
-                "duration_questions": [
-                    "Qual o prazo de vigência do contrato?",
-                    "Quando o contrato pode ser renovado?",
-                    "Qual a duração mínima do acordo?"
-                ],
-                "general_questions": [
-                    "Qual o número do contrato?",
-                    "Quem são as partes contratantes?",
-                    "Quais os principais termos do acordo?"
-                ]
-            }
-            
             # If document_id is provided, could customize suggestions based on document content
             # For now, return all suggestions
-            
             return self.success_response(
-                data=suggestions,
+                data=_QUERY_SUGGESTIONS,
                 message="Sugestões de consulta geradas"
             )
             
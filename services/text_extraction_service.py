@@ -2,17 +2,26 @@
 Text extraction service for different document formats with OCR support
 """
 import re
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
-from io import BytesIO
 import tempfile
 import os
+import mmap
+import hashlib
+from functools import lru_cache
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 # Document processing libraries
-import PyPDF2
+import pypdfium2 as pdfium
 from docx import Document as DocxDocument
 import fitz  # PyMuPDF
-from PIL import Image
+from PIL import Image, ImageEnhance
+import numpy as np
 import pytesseract
 
 # Configure Tesseract path based on environment
@@ -63,13 +72,143 @@ def configure_tesseract():
     
     return False
 
+# Uncompressed image handed to OCR: (PIL mode, (width, height), pixel bytes)
+_RawImage = Tuple[str, Tuple[int, int], bytes]
+
+# Images per OCR batch handed to a worker while the rest of the document is still being read
+_OCR_BATCH_SIZE = 8
+
 # Configure Tesseract on import
 TESSERACT_AVAILABLE = configure_tesseract()
 
+# Tesseract's OpenMP threads mostly contend with each other on page-sized images
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+@lru_cache(maxsize=1)
+def _tesseract_version() -> Optional[int]:
+    """Probe the configured Tesseract binary once per process, returning its major version (None if it does not run)"""
+    if not TESSERACT_AVAILABLE:
+        return None
+    
+    try:
+        cmd = pytesseract.pytesseract.tesseract_cmd
+        if isinstance(cmd, str):
+            result = subprocess.run([cmd, '--version'], 
+                                  capture_output=True, text=True, timeout=5)
+            if result.returncode == 0:
+                # Older releases print the version to stderr
+                match = re.search(r'tesseract\s+v?(\d+)', result.stdout + result.stderr)
+                return int(match.group(1)) if match else 0
+        return None
+    except:
+        return None
+
+def _tesseract_works() -> bool:
+    """Check that the configured Tesseract binary runs"""
+    return _tesseract_version() is not None
+
+@lru_cache(maxsize=1)
+def _ocr_configs() -> Tuple[Tuple[str, str], ...]:
+    """
+    OCR configurations in the order they are tried: one multi-language pass, then the
+    full-page layout pass only when it finds nothing
+    """
+    # Tesseract 4+ ships the LSTM engine, select it directly rather than through the default mode
+    oem = 1 if (_tesseract_version() or 0) >= 4 else 3
+    return (
+        # Skipping the inverted-text check speeds up the first pass; the retry keeps it for light-on-dark text
+        ('Portuguese + English + PSM 6', rf'--oem {oem} --psm 6 -l por+eng -c tessedit_do_invert=0'),
+        ('Portuguese + English + PSM 3', rf'--oem {oem} --psm 3 -l por+eng')
+    )
+
+def _contrast_table(histogram: List[int], factor: float) -> List[int]:
+    """
+    Build the lookup table of ImageEnhance.Contrast for a grayscale histogram
+    
+    Computed in float32 and truncated like Pillow's blend, so the table reproduces it exactly
+    """
+    total = sum(histogram)
+    mean = int(sum(i * count for i, count in enumerate(histogram)) / total + 0.5) if total else 0
+    
+    levels = np.float32(mean) + np.float32(factor) * (np.arange(256, dtype=np.float32) - np.float32(mean))
+    return np.clip(levels, 0, 255).astype(np.uint8).tolist()
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    """Compute the Otsu threshold of a 256-bin grayscale histogram"""
+    total = sum(histogram)
+    if total == 0:
+        return 127
+    
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = 0
+    weight_background = 0
+    best_threshold = 0
+    best_variance = 0.0
+    
+    for i, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        
+        sum_background += i * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        
+        # Maximize the between-class variance
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = i
+    
+    return best_threshold
+
 from services.base_service import BaseService
-from models.document import Document, DocumentSection, DocumentStatus
+from models.document import Document, DocumentSection, DocumentStatus, FileType
 from config import config
 
+# Contract section headers (cleaned text has no line breaks, so headers are matched anywhere)
+SECTION_HEADER_PATTERN = re.compile(r'\b(?:CL[ÁA]USULA|SE[ÇC][ÃA]O|ARTIGO)\s+[IVXLC\d]+[ºª°]?(?=[\s.:-]|$)')
+
+# Page markers inserted by the PDF extractors, compiled once at import
+_PAGE_MARKER_PATTERN = re.compile(r'--- PÁGINA \d+ ---')
+
+def _compile_contract_patterns(patterns: List[str]) -> Tuple[re.Pattern, ...]:
+    """Compile case-insensitive contract information patterns"""
+    return tuple(re.compile(pattern, re.IGNORECASE) for pattern in patterns)
+
+# Contract information patterns
+_CONTRACT_NUMBER_PATTERNS = _compile_contract_patterns([
+    r'contrato\s+n[°º]?\s*(\w+[-/]\w+[-/]\w+)',
+    r'contrato\s+(\w+[-/]\w+[-/]\w+)',
+    r'n[°º]\s*(\w+[-/]\w+[-/]\w+)'
+])
+_SLA_PATTERNS = _compile_contract_patterns([
+    r'sla\s+.*?(\d+)\s*(horas?|dias?|minutos?)',
+    r'prazo\s+.*?(\d+)\s*(horas?|dias?|minutos?)',
+    r'atendimento\s+.*?(\d+)\s*(horas?|dias?|minutos?)',
+    r'(\d+)\s*(horas?|dias?|minutos?)\s+para.*?(incidente|atendimento|sla)',
+    r'será\s+de\s+(\d+)\s*(horas?|dias?|minutos?)'
+])
+_FIBER_PATTERNS = _compile_contract_patterns([
+    r'(\d+(?:,\d+)?)\s*km\s+de\s+fibra',
+    r'fibra\s+(?:óptica\s+)?.*?(\d+(?:,\d+)?)\s*km',
+    r'extensão\s+de\s+(\d+(?:,\d+)?)\s*km',
+    r'será\s+de\s+(\d+(?:,\d+)?)\s*km'
+])
+_PENALTY_PATTERNS = _compile_contract_patterns([
+    r'multa\s+de\s+r\$\s*(\d+(?:\.\d{3})*(?:,\d{2})?)',
+    r'penalidade\s+de\s+r\$\s*(\d+(?:\.\d{3})*(?:,\d{2})?)',
+    r'valor\s+da\s+multa\s*:\s*r\$\s*(\d+(?:\.\d{3})*(?:,\d{2})?)'
+])
+_DURATION_PATTERNS = _compile_contract_patterns([
+    r'vigência\s+de\s+(\d+)\s*(anos?|meses?)',
+    r'prazo\s+de\s+(\d+)\s*(anos?|meses?)',
+    r'duração\s+de\s+(\d+)\s*(anos?|meses?)'
+])
+
 class TextExtractionService(BaseService):
     """Service for extracting text from various document formats"""
     
@@ -77,6 +216,13 @@ class TextExtractionService(BaseService):
         super().__init__()
         self.chunk_size = config.CHUNK_SIZE
         self.chunk_overlap = config.CHUNK_OVERLAP
+        
+        # File type -> extractor, resolved with one dict lookup per file
+        self._extractors = {
+            FileType.PDF.value: self._extract_from_pdf,
+            FileType.DOCX.value: self._extract_from_docx,
+            FileType.TXT.value: self._extract_from_txt
+        }
     
     def extract_text_from_file(self, file_path: Path, file_type: str) -> Dict[str, Any]:
         """
@@ -97,17 +243,13 @@ class TextExtractionService(BaseService):
                 )
             
             # Extract text based on file type
-            if file_type.lower() == 'pdf':
-                text_content, metadata = self._extract_from_pdf(file_path)
-            elif file_type.lower() == 'docx':
-                text_content, metadata = self._extract_from_docx(file_path)
-            elif file_type.lower() == 'txt':
-                text_content, metadata = self._extract_from_txt(file_path)
-            else:
+            extractor = self._extractors.get(file_type.lower())
+            if extractor is None:
                 return self.handle_error(
                     Exception(f"Tipo de arquivo não suportado: {file_type}"),
                     "file extraction"
                 )
+            text_content, metadata = extractor(file_path)
             
             # Clean and process text
             cleaned_text = self._clean_text(text_content)
@@ -115,6 +257,9 @@ class TextExtractionService(BaseService):
             # Create text chunks
             chunks = self._create_text_chunks(cleaned_text)
             
+            # Cleaned text is single-space separated, so counting spaces gives the word count
+            total_words = cleaned_text.count(' ') + 1 if cleaned_text else 0
+            
             self.log_info(f"Text extracted successfully from {file_path.name}")
             self.log_info(f"Extracted {len(cleaned_text)} characters in {len(chunks)} chunks")
             
@@ -125,7 +270,7 @@ class TextExtractionService(BaseService):
                     "metadata": metadata,
                     "stats": {
                         "total_chars": len(cleaned_text),
-                        "total_words": len(cleaned_text.split()),
+                        "total_words": total_words,
                         "total_chunks": len(chunks),
                         "avg_chunk_size": len(cleaned_text) // len(chunks) if chunks else 0
                     }
@@ -138,58 +283,72 @@ class TextExtractionService(BaseService):
     
     def _extract_from_pdf(self, file_path: Path) -> Tuple[str, Dict[str, Any]]:
         """Extract text from PDF file with OCR support for images"""
-        text_content = ""
-        metadata = {"pages": 0, "format": "pdf", "ocr_used": False, "images_processed": 0}
+        metadata = {"pages": 0, "format": "pdf", "ocr_used": False, "images_processed": 0, "ocr_skipped_pages": 0}
         
         try:
             # Use PyMuPDF for better PDF handling
             pdf_document = fitz.open(str(file_path))
             metadata["pages"] = len(pdf_document)
             
+            page_parts = []
+            ocr_jobs = []  # (page index, image index, index into ocr_images)
+            ocr_queue = _OcrQueue(self)  # distinct raw images, OCRed in batches while later pages are read
+            xref_images = {}  # image xref -> index in the OCR queue
+            content_images = {}  # (mode, size, pixel digest) -> index in the OCR queue
+            
             for page_num in range(len(pdf_document)):
                 page = pdf_document[page_num]
                 
                 # Add page marker
-                text_content += f"\n--- PÁGINA {page_num + 1} ---\n"
+                parts = [f"\n--- PÁGINA {page_num + 1} ---\n"]
+                page_parts.append(parts)
                 
                 # Extract regular text
                 page_text = page.get_text()
                 if page_text.strip():
-                    text_content += page_text + "\n"
+                    parts.append(page_text + "\n")
                     self.log_info(f"Extracted text from page {page_num + 1}: {len(page_text)} chars")
                 
-                # Extract text from images using OCR
                 image_list = page.get_images()
+                
+                # Pages that already carry enough native text are not scanned, skip OCR on their images
+                # unless the images take up most of the page (e.g. a scan with a text header)
+                if (config.OCR_MIN_PAGE_CHARS > 0 and len(page_text.strip()) >= config.OCR_MIN_PAGE_CHARS
+                        and self._image_coverage(page, image_list) <= config.OCR_IMAGE_COVERAGE):
+                    metadata["ocr_skipped_pages"] += 1
+                    continue
+                
+                # Collect images for OCR
                 if image_list:
                     self.log_info(f"Found {len(image_list)} images on page {page_num + 1}")
                     
                     for img_index, img in enumerate(image_list):
                         try:
-                            # Extract image
+                            # Logos and watermarks repeated on every page share one xref, OCR them once
                             xref = img[0]
-                            pix = fitz.Pixmap(pdf_document, xref)
-                            
-                            # Convert to PIL Image if needed
-                            if pix.n - pix.alpha < 4:  # GRAY or RGB
-                                img_data = pix.tobytes("png")
-                                pil_image = Image.open(BytesIO(img_data))
-                                
-                                # Perform OCR
-                                ocr_text = self._extract_text_from_image(pil_image)
-                                
-                                if ocr_text.strip():
-                                    text_content += f"\n[TEXTO EXTRAÍDO DA IMAGEM {img_index + 1}]\n"
-                                    text_content += ocr_text + "\n"
-                                    metadata["ocr_used"] = True
-                                    metadata["images_processed"] += 1
-                                    self.log_info(f"OCR extracted {len(ocr_text)} chars from image {img_index + 1} on page {page_num + 1}")
-                            
-                            pix = None  # Free memory
+                            if xref not in xref_images:
+                                xref_images[xref] = self._add_ocr_image(
+                                    page, xref, fitz.Pixmap(pdf_document, xref), ocr_queue, content_images
+                                )
+                            ocr_jobs.append((page_num, img_index, xref_images[xref]))
                             
                         except Exception as e:
                             self.log_warning(f"Error processing image {img_index + 1} on page {page_num + 1}: {str(e)}")
                             continue
             
+            # Wait for the OCR of all collected images, then place results back under their pages
+            ocr_texts = ocr_queue.results()
+            for page_num, img_index, image_idx in ocr_jobs:
+                ocr_text = ocr_texts[image_idx]
+                if ocr_text.strip():
+                    page_parts[page_num].append(f"\n[TEXTO EXTRAÍDO DA IMAGEM {img_index + 1}]\n")
+                    page_parts[page_num].append(ocr_text + "\n")
+                    metadata["ocr_used"] = True
+                    metadata["images_processed"] += 1
+                    self.log_info(f"OCR extracted {len(ocr_text)} chars from image {img_index + 1} on page {page_num + 1}")
+            
+            text_content = "".join(part for parts in page_parts for part in parts)
+            
             # Extract metadata
             pdf_metadata = pdf_document.metadata
             if pdf_metadata:
@@ -203,46 +362,222 @@ class TextExtractionService(BaseService):
             pdf_document.close()
             
         except Exception as e:
-            # Fallback to PyPDF2 if PyMuPDF fails
-            self.log_warning(f"PyMuPDF failed, falling back to PyPDF2: {str(e)}")
+            # Fallback to pypdfium2 if PyMuPDF fails
+            self.log_warning(f"PyMuPDF failed, falling back to pypdfium2: {str(e)}")
             return self._extract_from_pdf_fallback(file_path)
         
         return text_content, metadata
     
     def _extract_from_pdf_fallback(self, file_path: Path) -> Tuple[str, Dict[str, Any]]:
-        """Fallback PDF extraction using PyPDF2"""
-        text_content = ""
+        """Fallback PDF extraction using pypdfium2"""
+        text_parts = []
         metadata = {"pages": 0, "format": "pdf", "fallback_used": True}
         
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                metadata["pages"] = len(pdf_reader.pages)
+            pdf_document = pdfium.PdfDocument(str(file_path))
+            try:
+                metadata["pages"] = len(pdf_document)
                 
                 # Extract text from each page
-                for page_num, page in enumerate(pdf_reader.pages):
+                for page_num in range(len(pdf_document)):
                     try:
-                        page_text = page.extract_text()
+                        page = pdf_document[page_num]
+                        text_page = page.get_textpage()
+                        page_text = text_page.get_text_range()
+                        text_page.close()
+                        page.close()
+                        
                         if page_text.strip():
-                            text_content += f"\n--- PÁGINA {page_num + 1} ---\n"
-                            text_content += page_text + "\n"
+                            text_parts.append(f"\n--- PÁGINA {page_num + 1} ---\n")
+                            text_parts.append(page_text + "\n")
                     except Exception as e:
                         self.log_warning(f"Error extracting page {page_num + 1}: {str(e)}")
                         continue
                 
                 # Extract metadata if available
-                if pdf_reader.metadata:
+                pdf_metadata = pdf_document.get_metadata_dict()
+                if pdf_metadata:
                     metadata.update({
-                        "title": pdf_reader.metadata.get('/Title', ''),
-                        "author": pdf_reader.metadata.get('/Author', ''),
-                        "subject": pdf_reader.metadata.get('/Subject', ''),
-                        "creator": pdf_reader.metadata.get('/Creator', '')
+                        "title": pdf_metadata.get('Title', ''),
+                        "author": pdf_metadata.get('Author', ''),
+                        "subject": pdf_metadata.get('Subject', ''),
+                        "creator": pdf_metadata.get('Creator', '')
                     })
+            finally:
+                pdf_document.close()
                     
         except Exception as e:
             raise Exception(f"Erro ao processar PDF: {str(e)}")
         
-        return text_content, metadata
+        return "".join(text_parts), metadata
+    
+    def _image_coverage(self, page, image_list: List) -> float:
+        """
+        Fraction of the page area covered by its images
+        
+        Args:
+            page: PyMuPDF page
+            image_list: Images of the page as returned by page.get_images()
+            
+        Returns:
+            Covered fraction, capped at 1.0 (overlapping images are counted twice)
+        """
+        page_area = page.rect.width * page.rect.height
+        if not image_list or page_area <= 0:
+            return 0.0
+        
+        image_area = sum(
+            abs(rect.width * rect.height)
+            for xref in {img[0] for img in image_list}
+            for rect in page.get_image_rects(xref)
+        )
+        return min(1.0, image_area / page_area)
+    
+    def _prepare_pixmap_for_ocr(self, page, xref: int, pix):
+        """
+        Convert an embedded image to grayscale and downscale it to the OCR target DPI
+        
+        Args:
+            page: PyMuPDF page the image is placed on
+            xref: Image cross-reference number
+            pix: Image pixmap
+            
+        Returns:
+            Pixmap ready to be encoded for OCR
+        """
+        # Tesseract only needs luminance (CMYK and RGB alike), which also shrinks the image sent to workers
+        if pix.colorspace and pix.colorspace.n != 1:
+            pix = fitz.Pixmap(fitz.csGRAY, pix)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)
+        
+        # Effective resolution is the pixel width over the width the image is drawn at on the page
+        rects = page.get_image_rects(xref)
+        if not rects or config.OCR_TARGET_DPI <= 0:
+            return pix
+        
+        drawn_width_inches = max(rect.width for rect in rects) / 72
+        if drawn_width_inches <= 0:
+            return pix
+        
+        scale = config.OCR_TARGET_DPI / (pix.width / drawn_width_inches)
+        if scale < 1:
+            new_width = max(1, int(pix.width * scale))
+            new_height = max(1, int(pix.height * scale))
+            pix = fitz.Pixmap(pix, new_width, new_height, None)
+        
+        return pix
+    
+    def _add_ocr_image(self, page, xref: int, pix, ocr_queue: "_OcrQueue",
+                       content_images: Dict[Tuple, int]) -> int:
+        """
+        Queue an embedded image for OCR unless an identical image is already queued
+        
+        Args:
+            page: PyMuPDF page the image is placed on
+            xref: Image cross-reference number
+            pix: Image pixmap
+            ocr_queue: Queue of the distinct images to OCR
+            content_images: (mode, size, pixel digest) -> index in the OCR queue
+            
+        Returns:
+            Index of the image in the OCR queue
+        """
+        raw_image = self._pixmap_to_raw_image(self._prepare_pixmap_for_ocr(page, xref, pix))
+        
+        # The same picture can also be embedded several times under different xrefs
+        mode, size, samples = raw_image
+        content_key = (mode, size, hashlib.blake2b(samples, digest_size=16).digest())
+        if content_key not in content_images:
+            content_images[content_key] = ocr_queue.add(raw_image)
+        
+        return content_images[content_key]
+    
+    def _pixmap_to_raw_image(self, pix) -> _RawImage:
+        """Take the pixel samples of a prepared pixmap as is, skipping a PNG encode and decode"""
+        if pix.n == 1:
+            mode = "L"
+        elif pix.n == 3:
+            mode = "RGB"
+        else:
+            raise ValueError(f"Unsupported pixmap with {pix.n} channels")
+        return mode, (pix.width, pix.height), pix.samples
+    
+    def _ocr_image_batch(self, images: List[_RawImage]) -> List[str]:
+        """OCR a batch of raw images, images that cannot be decoded yield an empty text"""
+        decoded = {}
+        for i, (mode, size, samples) in enumerate(images):
+            try:
+                decoded[i] = Image.frombytes(mode, size, samples)
+            except Exception as e:
+                self.log_warning(f"Error decoding image for OCR: {str(e)}")
+        
+        texts = dict(zip(decoded, self._extract_text_from_images(list(decoded.values()))))
+        return [texts.get(i, "") for i in range(len(images))]
+    
+    def _extract_text_from_images(self, images: List[Image.Image]) -> List[str]:
+        """
+        Extract text from several images, running the first OCR pass for all of them in one Tesseract process
+        
+        Args:
+            images: Images to OCR
+            
+        Returns:
+            List of extracted texts in the same order as images
+        """
+        if len(images) < 2 or not self._is_tesseract_available():
+            return [self._extract_text_from_image(image) for image in images]
+        
+        try:
+            processed_images = [self._preprocess_image_for_ocr(image) for image in images]
+            batch_texts = self._run_tesseract_batch(processed_images)
+        except Exception as e:
+            self.log_warning(f"Batch OCR failed, running per image: {str(e)}")
+            return [self._extract_text_from_image(image) for image in images]
+        
+        # Images the first pass found nothing on go through the remaining configurations on their own
+        return [
+            text.strip() or self._ocr_processed_image(processed_image, _ocr_configs()[1:])
+            for processed_image, text in zip(processed_images, batch_texts)
+        ]
+    
+    def _run_tesseract_batch(self, images: List[Image.Image]) -> List[str]:
+        """
+        Run the first OCR configuration over several images with a single Tesseract invocation
+        
+        Args:
+            images: Preprocessed images
+            
+        Returns:
+            List of raw texts in the same order as images
+        """
+        config_name, ocr_config = _ocr_configs()[0]
+        
+        with tempfile.TemporaryDirectory(prefix="ocr_batch_") as tmp_dir:
+            # Tesseract reads a text file listing one image path per line as a multi-page input
+            image_paths = []
+            for i, image in enumerate(images):
+                image_path = os.path.join(tmp_dir, f"image_{i}.png")
+                image.save(image_path)
+                image_paths.append(image_path)
+            
+            list_path = os.path.join(tmp_dir, "images.txt")
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(image_paths) + "\n")
+            
+            output_base = os.path.join(tmp_dir, "output")
+            pytesseract.pytesseract.run_tesseract(list_path, output_base, extension='txt', lang=None, config=ocr_config)
+            
+            with open(f"{output_base}.txt", 'r', encoding='utf-8') as f:
+                output = f.read()
+        
+        # Every page of the output ends with a form feed
+        texts = output.split("\f")
+        if len(texts) != len(images) + 1:
+            raise Exception(f"Tesseract returned {len(texts) - 1} pages for {len(images)} images")
+        
+        self.log_info(f"Batch OCR with {config_name} processed {len(images)} images")
+        return texts[:-1]
     
     def _extract_text_from_image(self, image: Image.Image) -> str:
         """Extract text from image using OCR"""
@@ -255,31 +590,48 @@ class TextExtractionService(BaseService):
             # Preprocess image for better OCR
             processed_image = self._preprocess_image_for_ocr(image)
             
-            # Try multiple OCR configurations for better results
-            configs = [
-                ('Portuguese + PSM 6', r'--oem 3 --psm 6 -l por'),
-                ('Portuguese + PSM 3', r'--oem 3 --psm 3 -l por'),
-                ('English + PSM 6', r'--oem 3 --psm 6'),
-                ('Default', r'--psm 6')
-            ]
+            return self._ocr_processed_image(processed_image, _ocr_configs())
             
+        except Exception as e:
+            self.log_warning(f"OCR completely failed: {str(e)}")
+            return "[IMAGEM DETECTADA - OCR FALHOU]"
+    
+    def _ocr_processed_image(self, processed_image: Image.Image, configs: Tuple[Tuple[str, str], ...]) -> str:
+        """
+        OCR a preprocessed image, trying each configuration until one finds text
+        
+        Args:
+            processed_image: Preprocessed image
+            configs: (name, Tesseract config) pairs to try in order
+            
+        Returns:
+            Extracted text, or a failure marker when no configuration found any
+        """
+        try:
             best_text = ""
-            best_confidence = 0
+            languages_failed = 0
             
-            for config_name, config in configs:
+            for config_name, ocr_config in configs:
                 try:
-                    text = pytesseract.image_to_string(processed_image, config=config)
-                    text = text.strip()
+                    text = pytesseract.image_to_string(processed_image, config=ocr_config).strip()
                     
-                    if text and len(text) > len(best_text):
+                    if text:
                         best_text = text
                         self.log_info(f"OCR success with {config_name}: {len(text)} chars")
                         break  # Use first successful result
                         
                 except Exception as e:
+                    languages_failed += 1
                     self.log_warning(f"OCR failed with {config_name}: {str(e)}")
                     continue
             
+            # The default language only runs when the Portuguese data is not installed
+            if not best_text and languages_failed == len(configs):
+                try:
+                    best_text = pytesseract.image_to_string(processed_image, config=r'--psm 6').strip()
+                except Exception as e:
+                    self.log_warning(f"OCR failed with Default: {str(e)}")
+            
             if best_text:
                 return best_text
             else:
@@ -291,23 +643,8 @@ class TextExtractionService(BaseService):
             return "[IMAGEM DETECTADA - OCR FALHOU]"
     
     def _is_tesseract_available(self) -> bool:
-        """Check if Tesseract is available"""
-        global TESSERACT_AVAILABLE
-        
-        if not TESSERACT_AVAILABLE:
-            return False
-            
-        try:
-            # Test if Tesseract actually works
-            import subprocess
-            cmd = pytesseract.pytesseract.tesseract_cmd
-            if isinstance(cmd, str):
-                result = subprocess.run([cmd, '--version'], 
-                                      capture_output=True, text=True, timeout=5)
-                return result.returncode == 0
-            return False
-        except:
-            return False
+        """Check if Tesseract is available (the binary is probed once per process)"""
+        return _tesseract_works()
     
     def _preprocess_image_for_ocr(self, image: Image.Image) -> Image.Image:
         """Preprocess image to improve OCR accuracy"""
@@ -331,15 +668,26 @@ class TextExtractionService(BaseService):
                 image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
                 self.log_info(f"Image resized from {width}x{height} to {new_width}x{new_height}")
             
-            # Apply contrast enhancement
-            from PIL import ImageEnhance
-            enhancer = ImageEnhance.Contrast(image)
-            image = enhancer.enhance(1.2)  # Slight contrast boost
+            # Shrink oversized scans, Tesseract time grows with the pixel count
+            max_side = config.OCR_MAX_IMAGE_SIDE
+            if max_side > 0 and max(image.size) > max_side:
+                scale_factor = max_side / max(image.size)
+                new_width = max(1, int(image.width * scale_factor))
+                new_height = max(1, int(image.height * scale_factor))
+                image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                self.log_info(f"Image downscaled from {width}x{height} to {new_width}x{new_height}")
+            
+            # Apply contrast enhancement as a single lookup table pass
+            image = image.point(_contrast_table(image.histogram(), 1.2))  # Slight contrast boost
             
             # Apply sharpening
             enhancer = ImageEnhance.Sharpness(image)
             image = enhancer.enhance(1.1)  # Slight sharpening
             
+            # Binarize with an Otsu threshold, Tesseract reads clean black/white text fastest
+            threshold = _otsu_threshold(image.histogram())
+            image = image.point(lambda p: 255 if p > threshold else 0)
+            
             return image
             
         except Exception as e:
@@ -348,7 +696,6 @@ class TextExtractionService(BaseService):
     
     def _extract_from_docx(self, file_path: Path) -> Tuple[str, Dict[str, Any]]:
         """Extract text from DOCX file"""
-        text_content = ""
         metadata = {"format": "docx", "paragraphs": 0}
         
         try:
@@ -357,9 +704,12 @@ class TextExtractionService(BaseService):
             # Extract text from paragraphs
             paragraphs = []
             for para in doc.paragraphs:
-                if para.text.strip():
-                    paragraphs.append(para.text)
-                    text_content += para.text + "\n"
+                # Paragraph.text rebuilds the string from its runs, read it once
+                para_text = para.text
+                if para_text.strip():
+                    paragraphs.append(para_text)
+            
+            text_content = "".join(f"{para_text}\n" for para_text in paragraphs)
             
             metadata["paragraphs"] = len(paragraphs)
             
@@ -388,19 +738,22 @@ class TextExtractionService(BaseService):
             encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
             text_content = ""
             
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as file:
-                        text_content = file.read()
-                        metadata["encoding"] = encoding
-                        break
-                except UnicodeDecodeError:
-                    continue
+            # Map the file once and decode straight from the mapping, so encoding retries don't re-read it
+            with open(file_path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size:
+                    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        for encoding in encodings:
+                            try:
+                                text_content = str(mapped, encoding)
+                                metadata["encoding"] = encoding
+                                break
+                            except UnicodeDecodeError:
+                                continue
             
             if not text_content:
                 raise Exception("Não foi possível decodificar o arquivo de texto")
                 
-            metadata["lines"] = len(text_content.split('\n'))
+            metadata["lines"] = text_content.count('\n') + 1
             
         except Exception as e:
             raise Exception(f"Erro ao processar TXT: {str(e)}")
@@ -412,17 +765,12 @@ class TextExtractionService(BaseService):
         if not text:
             return ""
         
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
         # Remove page markers for cleaner text
-        text = re.sub(r'--- PÁGINA \d+ ---', '', text)
+        text = _PAGE_MARKER_PATTERN.sub('', text)
         
-        # Normalize line breaks
-        text = re.sub(r'\n\s*\n', '\n\n', text)
-        
-        # Remove leading/trailing whitespace
-        text = text.strip()
+        # Collapse whitespace to single spaces and trim (after marker removal so words stay single-space
+        # separated); str.split() uses the same whitespace as \s, and no blank lines are left afterwards
+        text = ' '.join(text.split())
         
         return text
     
@@ -442,6 +790,13 @@ class TextExtractionService(BaseService):
         chunks = []
         words = text.split()
         
+        # Locate section headers so each chunk can carry the header it falls under
+        headers = [(match.start(), match.group(0)) for match in SECTION_HEADER_PATTERN.finditer(text)]
+        header_positions = [position for position, _ in headers]
+        
+        # Character offset of every word (+1 for the space), so chunk positions are O(1) lookups
+        word_offsets = [0, *accumulate(len(word) + 1 for word in words)]
+        
         # Calculate words per chunk (approximate)
         words_per_chunk = self.chunk_size // 5  # Assuming average 5 chars per word
         overlap_words = self.chunk_overlap // 5
@@ -455,12 +810,19 @@ class TextExtractionService(BaseService):
             chunk_words = words[start_idx:end_idx]
             chunk_text = ' '.join(chunk_words)
             
-            # Create document section
-            section = DocumentSection(
+            start_char = min(word_offsets[start_idx], len(text))
+            
+            # Prepend the nearest preceding header when the chunk starts inside a section
+            header_idx = bisect_right(header_positions, start_char) - 1
+            if header_idx >= 0 and header_positions[header_idx] < start_char:
+                chunk_text = f"[{headers[header_idx][1]}] {chunk_text}"
+            
+            # Create document section (fields are built here with the right types, skip validation)
+            section = DocumentSection.model_construct(
                 content=chunk_text,
                 section_id=f"chunk_{chunk_num}",
-                start_char=self._get_char_position(text, start_idx, words),
-                end_char=self._get_char_position(text, end_idx - 1, words)
+                start_char=start_char,
+                end_char=min(word_offsets[end_idx - 1], len(text))
             )
             
             chunks.append(section)
@@ -475,15 +837,6 @@ class TextExtractionService(BaseService):
         
         return chunks
     
-    def _get_char_position(self, text: str, word_idx: int, words: List[str]) -> int:
-        """Get character position for a word index"""
-        if word_idx >= len(words):
-            return len(text)
-        
-        # Approximate character position
-        chars_before = sum(len(word) + 1 for word in words[:word_idx])  # +1 for space
-        return min(chars_before, len(text))
-    
     def process_document(self, document: Document, file_path: Path) -> Dict[str, Any]:
         """
         Process a document and extract text with chunking
@@ -513,6 +866,7 @@ class TextExtractionService(BaseService):
                 "status": DocumentStatus.READY,
                 "text_content": extracted_data["text_content"],
                 "chunks": [chunk.model_dump() for chunk in extracted_data["chunks"]],
+                "chunk_models": extracted_data["chunks"],
                 "metadata": extracted_data["metadata"],
                 "stats": extracted_data["stats"]
             }
@@ -547,68 +901,31 @@ class TextExtractionService(BaseService):
                 "parties": []
             }
             
-            # Contract number patterns
-            contract_patterns = [
-                r'contrato\s+n[°º]?\s*(\w+[-/]\w+[-/]\w+)',
-                r'contrato\s+(\w+[-/]\w+[-/]\w+)',
-                r'n[°º]\s*(\w+[-/]\w+[-/]\w+)'
-            ]
-            
-            for pattern in contract_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
+            # Contract number
+            for pattern in _CONTRACT_NUMBER_PATTERNS:
+                match = pattern.search(text)
                 if match:
                     contract_info["contract_number"] = match.group(1)
                     break
             
-            # SLA time patterns
-            sla_patterns = [
-                r'sla\s+.*?(\d+)\s*(horas?|dias?|minutos?)',
-                r'prazo\s+.*?(\d+)\s*(horas?|dias?|minutos?)',
-                r'atendimento\s+.*?(\d+)\s*(horas?|dias?|minutos?)',
-                r'(\d+)\s*(horas?|dias?|minutos?)\s+para.*?(incidente|atendimento|sla)',
-                r'será\s+de\s+(\d+)\s*(horas?|dias?|minutos?)'
-            ]
-            
-            for pattern in sla_patterns:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                for match in matches:
+            # SLA times
+            for pattern in _SLA_PATTERNS:
+                for match in pattern.finditer(text):
                     contract_info["sla_times"].append(f"{match.group(1)} {match.group(2)}")
             
-            # Fiber km patterns
-            fiber_patterns = [
-                r'(\d+(?:,\d+)?)\s*km\s+de\s+fibra',
-                r'fibra\s+(?:óptica\s+)?.*?(\d+(?:,\d+)?)\s*km',
-                r'extensão\s+de\s+(\d+(?:,\d+)?)\s*km',
-                r'será\s+de\s+(\d+(?:,\d+)?)\s*km'
-            ]
-            
-            for pattern in fiber_patterns:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                for match in matches:
+            # Fiber km
+            for pattern in _FIBER_PATTERNS:
+                for match in pattern.finditer(text):
                     contract_info["fiber_km"].append(match.group(1) + " km")
             
-            # Penalty value patterns
-            penalty_patterns = [
-                r'multa\s+de\s+r\$\s*(\d+(?:\.\d{3})*(?:,\d{2})?)',
-                r'penalidade\s+de\s+r\$\s*(\d+(?:\.\d{3})*(?:,\d{2})?)',
-                r'valor\s+da\s+multa\s*:\s*r\$\s*(\d+(?:\.\d{3})*(?:,\d{2})?)'
-            ]
-            
-            for pattern in penalty_patterns:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                for match in matches:
+            # Penalty values
+            for pattern in _PENALTY_PATTERNS:
+                for match in pattern.finditer(text):
                     contract_info["penalty_values"].append(f"R$ {match.group(1)}")
             
-            # Contract duration patterns
-            duration_patterns = [
-                r'vigência\s+de\s+(\d+)\s*(anos?|meses?)',
-                r'prazo\s+de\s+(\d+)\s*(anos?|meses?)',
-                r'duração\s+de\s+(\d+)\s*(anos?|meses?)'
-            ]
-            
-            for pattern in duration_patterns:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                for match in matches:
+            # Contract duration
+            for pattern in _DURATION_PATTERNS:
+                for match in pattern.finditer(text):
                     contract_info["contract_duration"].append(f"{match.group(1)} {match.group(2)}")
             
             return self.success_response(
@@ -617,4 +934,121 @@ class TextExtractionService(BaseService):
             )
             
         except Exception as e:
-            return self.handle_error(e, "contract info extraction")
\ No newline at end of file
+            return self.handle_error(e, "contract info extraction")
+
+# Per-process service used by OCR worker processes
+_ocr_worker_service: Optional[TextExtractionService] = None
+
+def _init_ocr_worker():
+    """Limit Tesseract to one thread per worker so workers do not oversubscribe the CPU"""
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+def _ocr_raw_image_batch(images: List[_RawImage]) -> List[str]:
+    """OCR a batch of raw images inside a worker process"""
+    global _ocr_worker_service
+    if _ocr_worker_service is None:
+        _ocr_worker_service = TextExtractionService()
+    return _ocr_worker_service._ocr_image_batch(images)
+
+# Shared OCR worker pool, kept across documents so workers are not re-spawned per PDF
+_ocr_executor: Optional[ProcessPoolExecutor] = None
+_ocr_executor_lock = threading.Lock()
+
+def _get_ocr_executor() -> ProcessPoolExecutor:
+    """Create the shared OCR process pool on first use"""
+    global _ocr_executor
+    
+    with _ocr_executor_lock:
+        if _ocr_executor is None:
+            # Spawned, not forked: a forked worker would inherit the logging queue without its listener
+            # thread (losing worker logs) and could copy its lock while held
+            _ocr_executor = ProcessPoolExecutor(
+                max_workers=config.OCR_MAX_WORKERS or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_ocr_worker
+            )
+    
+    return _ocr_executor
+
+def _reset_ocr_executor():
+    """Drop the shared OCR process pool, e.g. after a worker crashed and broke it"""
+    global _ocr_executor
+    
+    with _ocr_executor_lock:
+        if _ocr_executor is not None:
+            _ocr_executor.shutdown(wait=False, cancel_futures=True)
+            _ocr_executor = None
+
+class _OcrQueue:
+    """Collects the images of a document and hands full batches to the OCR pool while later pages are read"""
+    
+    def __init__(self, service: TextExtractionService):
+        self.service = service
+        self._pending: List[_RawImage] = []  # images not handed to the pool yet
+        self._batches = deque()  # (images, future) still running, oldest first
+        self._texts: List[str] = []
+        self._count = 0
+        self._workers = config.OCR_MAX_WORKERS or os.cpu_count() or 1
+    
+    def add(self, image: _RawImage) -> int:
+        """Queue an image, returning its index in the OCR results"""
+        self._pending.append(image)
+        self._count += 1
+        if self._workers > 1 and len(self._pending) >= _OCR_BATCH_SIZE:
+            batch, self._pending = self._pending, []
+            self._submit(batch)
+        return self._count - 1
+    
+    def _submit(self, batch: List[_RawImage]):
+        """Send a batch to the worker pool, waiting for the oldest one when too many are in flight"""
+        # Only in-flight batches keep their images, so bound how many there are
+        while len(self._batches) >= self._workers * 2:
+            self._collect_oldest()
+        
+        try:
+            # Tesseract is CPU bound, so threads would serialize on the GIL
+            future = _get_ocr_executor().submit(_ocr_raw_image_batch, batch)
+        except Exception as e:
+            _reset_ocr_executor()
+            self.service.log_warning(f"Parallel OCR failed, running sequentially: {str(e)}")
+            self._run_sequentially(batch)
+            return
+        self._batches.append((batch, future))
+    
+    def _collect_oldest(self):
+        """Append the texts of the oldest in-flight batch, OCRing it here if its worker failed"""
+        batch, future = self._batches.popleft()
+        try:
+            self._texts.extend(future.result())
+            return
+        except Exception as e:
+            _reset_ocr_executor()
+            self.service.log_warning(f"Parallel OCR failed, running sequentially: {str(e)}")
+        self._texts.extend(self.service._ocr_image_batch(batch))
+    
+    def _run_sequentially(self, batch: List[_RawImage]):
+        """OCR a batch in this process once the batches before it are collected"""
+        while self._batches:
+            self._collect_oldest()
+        self._texts.extend(self.service._ocr_image_batch(batch))
+    
+    def results(self) -> List[str]:
+        """
+        OCR the images not submitted yet and collect every text
+        
+        Returns:
+            List of extracted texts in the same order as the queued images
+        """
+        remaining, self._pending = self._pending, []
+        if self._workers > 1 and len(remaining) > 1:
+            # Spread the last partial batch over the workers
+            batch_size = -(-len(remaining) // min(self._workers, len(remaining)))
+            for i in range(0, len(remaining), batch_size):
+                self._submit(remaining[i:i + batch_size])
+        elif remaining:
+            self._run_sequentially(remaining)
+        
+        while self._batches:
+            self._collect_oldest()
+        
+        return self._texts
@@ -2,18 +2,91 @@
 Vector database service for document embeddings and semantic search
 """
 import os
+import re
+import json
+import time
 import uuid
-from typing import List, Dict, Any, Optional, Tuple
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from pathlib import Path
 
 import chromadb
 from chromadb.config import Settings
 import openai
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
 from services.base_service import BaseService
+from services.batch_embedding_service import BatchEmbeddingService
 from models.document import Document, DocumentSection
-from config import config
+from utils.embedding_cache import EmbeddingCache, get_text_hash
+from utils.semantic_cache import SemanticCache
+from utils.embedding_tokens import truncate_embedding_input
+from config import config, get_embedding_params, get_embedding_model_key
+
+# OpenAI rejects embedding requests above 300k input tokens
+_MAX_BATCH_TOKENS = 250_000
+
+# Most documents the ingestion worker embeds together
+_INGEST_MAX_DOCUMENTS = 32
+
+# Seconds before the first retry of a failed ingestion, doubled on each further failure
+_INGEST_RETRY_BASE_DELAY = 2.0
+_INGEST_RETRY_MAX_DELAY = 300.0
+
+# Trailing chunk number of section ids like "chunk_12"
+_CHUNK_NUMBER_PATTERN = re.compile(r'(\d+)$')
+
+# Cosine space makes 1 - distance the cosine similarity; hnswlib normalizes vectors once on insert.
+# The space is fixed when the collection is created, so existing collections keep L2 until reset.
+_COLLECTION_NAME = "contract_documents"
+_COLLECTION_METADATA = {"description": "Contract documents for semantic search", "hnsw:space": "cosine"}
+
+# Output dimensions of the embedding models when no reduced dimension is requested
+_MODEL_DIMENSIONS = {"text-embedding-ada-002": 1536, "text-embedding-3-small": 1536, "text-embedding-3-large": 3072}
+
+# Seconds a successful health probe is trusted before it is repeated
+_OPENAI_HEALTH_TTL = 60
+_CHROMADB_HEALTH_TTL = 30
+
+def _batch_texts(texts: List[str], batch_size: int) -> List[List[str]]:
+    """
+    Split texts into consecutive request batches
+    
+    Args:
+        texts: List of text strings to embed
+        batch_size: Maximum number of texts per request
+        
+    Returns:
+        Batches capped by text count and by estimated tokens (about 4 characters per token)
+    """
+    batch_size = max(1, batch_size)
+    batches = []
+    batch: List[str] = []
+    batch_tokens = 0
+    
+    for text in texts:
+        tokens = len(text) // 4 + 1
+        if batch and (len(batch) >= batch_size or batch_tokens + tokens > _MAX_BATCH_TOKENS):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _chunk_order(metadata: Dict[str, Any]) -> int:
+    """Position of a stored chunk in its document"""
+    chunk_index = metadata.get("chunk_index")
+    if chunk_index is None:
+        # Stored before chunk_index was recorded, fall back to the number in the chunk id
+        match = _CHUNK_NUMBER_PATTERN.search(str(metadata.get("chunk_id", "")))
+        return int(match.group(1)) if match else 0
+    return chunk_index
 
 class VectorService(BaseService):
     """Service for vector database operations and semantic search"""
@@ -23,6 +96,22 @@ class VectorService(BaseService):
         self.client = None
         self.collection = None
         self.openai_client = None
+        self.batch_embedding_service = None
+        self.embedding_cache = None
+        self.search_cache = None
+        self.distance_space = "cosine"
+        self.pending_path = None
+        self._ingest_queue = None
+        # Held while pending chunks are stored or a document's vectors are deleted
+        self._pending_lock = threading.Lock()
+        # document_id -> {"status": "retrying" | "failed", "error", "attempts"} for failed ingestions
+        self._ingest_failures: Dict[str, Dict[str, Any]] = {}
+        self._openai_last_ok = None
+        self._chromadb_last_ok = None
+        # Callbacks told which document's vectors changed (None for the whole collection)
+        self._change_listeners: List[Callable[[Optional[str]], None]] = []
+        # Bumped whenever vectors are deleted or the collection is reset, so callers can key caches on it
+        self.removal_generation = 0
         self._initialize_clients()
     
     def _initialize_clients(self):
@@ -38,10 +127,18 @@ class VectorService(BaseService):
             )
             
             # Get or create collection
-            self.collection = self.client.get_or_create_collection(
-                name="contract_documents",
-                metadata={"description": "Contract documents for semantic search"}
-            )
+            self.collection = self._open_collection()
+            
+            # Initialize embedding cache
+            if config.EMBEDDING_CACHE_ENABLED:
+                self.embedding_cache = EmbeddingCache(Path(config.VECTOR_DB_PATH) / "embed_cache.sqlite")
+            
+            # Initialize search result cache
+            if config.SEARCH_CACHE_ENABLED:
+                self.search_cache = SemanticCache(
+                    threshold=config.SEMANTIC_CACHE_THRESHOLD,
+                    max_entries=config.SEARCH_CACHE_MAX_ENTRIES
+                )
             
             # Initialize OpenAI client
             if config.OPENAI_API_KEY:
@@ -49,13 +146,92 @@ class VectorService(BaseService):
             else:
                 raise ValueError("OpenAI API key not configured")
             
+            # Start background ingestion
+            if config.INGEST_QUEUE_ENABLED:
+                self._start_ingest_worker()
+            
             self.log_info("Vector service initialized successfully")
             
         except Exception as e:
             self.log_error(f"Failed to initialize vector service: {str(e)}")
             raise
     
+    def _open_collection(self):
+        """
+        Open the contract collection, creating it in cosine space when it does not exist
+        
+        An existing collection keeps the distance space it was created with; its metadata
+        is not relabelled, since that would not change the space of its index. A collection
+        whose vectors come from another embedding model or dimension is re-created when it
+        is empty and rejected otherwise, as ChromaDB would fail every add and query on it.
+        
+        Raises:
+            ValueError: If the collection holds vectors of another embedding space
+        """
+        try:
+            collection = self.client.get_collection(name=_COLLECTION_NAME)
+        except ValueError:
+            # ChromaDB reports a missing collection as ValueError
+            collection = self._create_collection()
+        else:
+            stored_model = (collection.metadata or {}).get("embedding_model")
+            if stored_model != self._embedding_model_key():
+                if collection.count() == 0:
+                    # Nothing to lose, so start over with the configured embedding space recorded
+                    self.client.delete_collection(name=_COLLECTION_NAME)
+                    collection = self._create_collection()
+                elif stored_model is not None or not self._stored_dimensions_match(collection):
+                    raise ValueError(
+                        f"Collection {_COLLECTION_NAME} holds vectors of {stored_model or 'another embedding dimension'}, "
+                        f"not of the configured {self._embedding_model_key()}; set OPENAI_EMBEDDING_MODEL and "
+                        f"OPENAI_EMBEDDING_DIMS back, or delete {config.VECTOR_DB_PATH} and upload the documents again"
+                    )
+        
+        self.distance_space = (collection.metadata or {}).get("hnsw:space", "l2")
+        if self.distance_space != _COLLECTION_METADATA["hnsw:space"]:
+            self.log_warning(
+                f"Collection {_COLLECTION_NAME} uses {self.distance_space} distance; scores are converted "
+                f"to cosine similarity, reset the collection and re-ingest documents to switch to cosine space"
+            )
+        return collection
+    
+    def _create_collection(self):
+        """Create the contract collection in cosine space, recording the embedding model it is built for"""
+        metadata = {**_COLLECTION_METADATA, "embedding_model": self._embedding_model_key()}
+        dimensions = self._embedding_dimensions()
+        if dimensions:
+            metadata["embedding_dimensions"] = dimensions
+        
+        return self.client.get_or_create_collection(name=_COLLECTION_NAME, metadata=metadata)
+    
+    def _embedding_dimensions(self) -> Optional[int]:
+        """Vector size produced by the configured embedding model, None when unknown"""
+        params = get_embedding_params(config.OPENAI_EMBEDDING_MODEL, config.OPENAI_EMBEDDING_DIMS)
+        return params.get("dimensions") or _MODEL_DIMENSIONS.get(config.OPENAI_EMBEDDING_MODEL)
+    
+    def _stored_dimensions_match(self, collection) -> bool:
+        """Check a collection created before the model was recorded against the configured vector size"""
+        expected = self._embedding_dimensions()
+        sample = collection.get(limit=1, include=["embeddings"])
+        embeddings = sample["embeddings"] or []
+        return expected is None or not embeddings or len(embeddings[0]) == expected
+    
     def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Create embeddings for a list of texts, sending only cache misses to OpenAI
+        
+        Args:
+            texts: List of text strings to embed
+            
+        Returns:
+            List of embedding vectors in the same order as texts
+        """
+        if not texts:
+            return []
+        
+        return self._embed_with_cache(texts, self._request_embeddings)
+    
+    def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
         Create embeddings for a list of texts using OpenAI
         
@@ -69,22 +245,200 @@ class VectorService(BaseService):
             if not texts:
                 return []
             
-            # Create embeddings using OpenAI
-            response = self.openai_client.embeddings.create(
-                model=config.OPENAI_EMBEDDING_MODEL,
-                input=texts
-            )
+            batches = _batch_texts(texts, config.EMBEDDING_BATCH_SIZE)
+            embedding_params = get_embedding_params(config.OPENAI_EMBEDDING_MODEL, config.OPENAI_EMBEDDING_DIMS)
+            
+            def embed_batch(batch: List[str]) -> List[List[float]]:
+                response = self.openai_client.embeddings.create(
+                    input=[truncate_embedding_input(text) for text in batch], **embedding_params
+                )
+                return [item.embedding for item in response.data]
+            
+            # Create embeddings using OpenAI, overlapping the requests of large documents
+            if len(batches) == 1:
+                batch_embeddings = [embed_batch(batches[0])]
+            else:
+                workers = min(len(batches), max(1, config.EMBEDDING_MAX_CONCURRENCY))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    batch_embeddings = list(executor.map(embed_batch, batches))
+            
+            embeddings = [embedding for batch in batch_embeddings for embedding in batch]
+            
+            self.log_info(f"Created {len(embeddings)} embeddings in {len(batches)} requests")
+            return embeddings
+            
+        except Exception as e:
+            self.log_error(f"Error creating embeddings: {str(e)}")
+            raise
+    
+    async def acreate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Create embeddings concurrently, one OpenAI request per batch of texts
+        
+        Args:
+            texts: List of text strings to embed
+            
+        Returns:
+            List of embedding vectors in the same order as texts
+        """
+        try:
+            if not texts:
+                return []
             
-            # Extract embeddings from response
-            embeddings = [item.embedding for item in response.data]
+            # Sort by length so each request holds similarly sized inputs
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            sorted_texts = [texts[i] for i in order]
             
-            self.log_info(f"Created {len(embeddings)} embeddings")
+            batches = _batch_texts(sorted_texts, config.EMBEDDING_BATCH_SIZE)
+            
+            embedding_params = get_embedding_params(config.OPENAI_EMBEDDING_MODEL, config.OPENAI_EMBEDDING_DIMS)
+            
+            # Cap in-flight requests to stay within the OpenAI rate limits
+            semaphore = asyncio.Semaphore(config.EMBEDDING_MAX_CONCURRENCY)
+            
+            # The async client is bound to the running event loop, so it is
+            # created per call instead of being cached on the service
+            async with AsyncOpenAI(api_key=config.OPENAI_API_KEY) as client:
+                async def embed_batch(batch: List[str]) -> List[List[float]]:
+                    async with semaphore:
+                        response = await client.embeddings.create(
+                            input=[truncate_embedding_input(text) for text in batch], **embedding_params
+                        )
+                    return [item.embedding for item in response.data]
+                
+                batch_embeddings = await asyncio.gather(*[embed_batch(batch) for batch in batches])
+            
+            # Restore the original text order
+            embeddings: List[Optional[List[float]]] = [None] * len(texts)
+            sorted_embeddings = (embedding for batch in batch_embeddings for embedding in batch)
+            for index, embedding in zip(order, sorted_embeddings):
+                embeddings[index] = embedding
+            
+            self.log_info(f"Created {len(embeddings)} embeddings in {len(batches)} concurrent batches")
             return embeddings
             
         except Exception as e:
             self.log_error(f"Error creating embeddings: {str(e)}")
             raise
     
+    def _embedding_model_key(self) -> str:
+        """Cache key for the configured embedding model and dimensions"""
+        return get_embedding_model_key(config.OPENAI_EMBEDDING_MODEL, config.OPENAI_EMBEDDING_DIMS)
+    
+    def _split_cached_embeddings(self, texts: List[str]) -> Tuple[List[str], List[Optional[List[float]]], Dict[str, str]]:
+        """
+        Look up texts in the embedding cache
+        
+        Args:
+            texts: List of text strings to embed
+            
+        Returns:
+            Tuple of (text hashes, embeddings with None for misses, hash -> text for unique misses)
+        """
+        hashes = [get_text_hash(text) for text in texts]
+        cached = self.embedding_cache.get_many(self._embedding_model_key(), hashes)
+        embeddings = [cached.get(text_hash) for text_hash in hashes]
+        
+        # Identical chunks are only sent once
+        misses = {}
+        for text, text_hash, embedding in zip(texts, hashes, embeddings):
+            if embedding is None and text_hash not in misses:
+                misses[text_hash] = text
+        
+        self.log_info(f"Embedding cache: {len(texts) - len(misses)} hits, {len(misses)} misses")
+        return hashes, embeddings, misses
+    
+    def _merge_new_embeddings(self, hashes: List[str], embeddings: List[Optional[List[float]]],
+                              misses: Dict[str, str], new_embeddings: List[List[float]]) -> List[List[float]]:
+        """
+        Fill cache misses with freshly created embeddings and write them back to the cache
+        
+        Returns:
+            List of embedding vectors in the same order as hashes
+        """
+        created = dict(zip(misses.keys(), new_embeddings))
+        self.embedding_cache.put_many(self._embedding_model_key(), created)
+        
+        return [embedding if embedding is not None else created[text_hash]
+                for text_hash, embedding in zip(hashes, embeddings)]
+    
+    def _embed_with_cache(self, texts: List[str], embed_fn) -> List[List[float]]:
+        """Create embeddings with embed_fn, sending only cache misses to OpenAI"""
+        if self.embedding_cache is None:
+            return embed_fn(texts)
+        
+        hashes, embeddings, misses = self._split_cached_embeddings(texts)
+        new_embeddings = embed_fn(list(misses.values())) if misses else []
+        return self._merge_new_embeddings(hashes, embeddings, misses, new_embeddings)
+    
+    async def _aembed_with_cache(self, texts: List[str]) -> List[List[float]]:
+        """Create embeddings concurrently, sending only cache misses to OpenAI"""
+        if self.embedding_cache is None:
+            return await self.acreate_embeddings(texts)
+        
+        hashes, embeddings, misses = self._split_cached_embeddings(texts)
+        new_embeddings = await self.acreate_embeddings(list(misses.values())) if misses else []
+        return self._merge_new_embeddings(hashes, embeddings, misses, new_embeddings)
+    
+    def _prepare_chunk_records(self, document: Document, chunks: List[DocumentSection]) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+        """
+        Build the texts, ids and metadata stored for each chunk
+        
+        Args:
+            document: Document model
+            chunks: List of document sections/chunks
+            
+        Returns:
+            Tuple of (texts, chunk_ids, metadatas)
+        """
+        texts = [chunk.content for chunk in chunks]
+        chunk_ids = [f"{document.id}_{chunk.section_id}" for chunk in chunks]
+        
+        metadatas = []
+        for chunk_index, chunk in enumerate(chunks):
+            metadata = {
+                "document_id": document.id,
+                "document_filename": document.filename,
+                "document_type": document.file_type,
+                "chunk_id": chunk.section_id,
+                "chunk_index": chunk_index,
+                "page_number": chunk.page_number or 0,
+                "start_char": chunk.start_char or 0,
+                "end_char": chunk.end_char or 0
+            }
+            metadatas.append(metadata)
+        
+        return texts, chunk_ids, metadatas
+    
+    def _add_chunk_records(self, document_id: str, texts: List[str], chunk_ids: List[str],
+                           metadatas: List[Dict[str, Any]], embeddings: List[List[float]]) -> Dict[str, Any]:
+        """
+        Store prepared chunk records and their embeddings in ChromaDB
+        
+        Returns:
+            Dictionary with storage result
+        """
+        # One add per document; only split when it exceeds the client's batch limit
+        batch_size = max(1, config.CHROMA_MAX_BATCH_SIZE)
+        for i in range(0, len(chunk_ids), batch_size):
+            self.collection.add(
+                embeddings=embeddings[i:i + batch_size],
+                documents=texts[i:i + batch_size],
+                metadatas=metadatas[i:i + batch_size],
+                ids=chunk_ids[i:i + batch_size]
+            )
+        
+        self._vectors_changed(document_id)
+        self.log_info(f"Stored {len(texts)} chunks for document {document_id}")
+        
+        return self.success_response(
+            data={
+                "stored_count": len(texts),
+                "document_id": document_id
+            },
+            message=f"Armazenados {len(texts)} chunks no banco vetorial"
+        )
+    
     def store_document_chunks(self, document: Document, chunks: List[DocumentSection]) -> Dict[str, Any]:
         """
         Store document chunks in vector database
@@ -103,52 +457,261 @@ class VectorService(BaseService):
                     message="No chunks to store"
                 )
             
-            # Prepare data for storage
-            texts = [chunk.content for chunk in chunks]
-            chunk_ids = [f"{document.id}_{chunk.section_id}" for chunk in chunks]
+            texts, chunk_ids, metadatas = self._prepare_chunk_records(document, chunks)
             
-            # Create embeddings
+            # Hand the chunks to the background worker when ingestion is queued
+            if self._ingest_queue is not None:
+                return self._enqueue_chunk_records(document.id, texts, chunk_ids, metadatas)
+            
+            # Create embeddings, reusing cached vectors for known chunks
             embeddings = self.create_embeddings(texts)
             
-            # Prepare metadata
-            metadatas = []
-            for chunk in chunks:
-                metadata = {
-                    "document_id": document.id,
-                    "document_filename": document.filename,
-                    "document_type": document.file_type,
-                    "chunk_id": chunk.section_id,
-                    "page_number": chunk.page_number or 0,
-                    "start_char": chunk.start_char or 0,
-                    "end_char": chunk.end_char or 0
-                }
-                metadatas.append(metadata)
+            return self._add_chunk_records(document.id, texts, chunk_ids, metadatas, embeddings)
             
-            # Store in ChromaDB
-            self.collection.add(
-                embeddings=embeddings,
-                documents=texts,
-                metadatas=metadatas,
-                ids=chunk_ids
-            )
+        except Exception as e:
+            return self.handle_error(e, "document chunk storage")
+    
+    def _start_ingest_worker(self):
+        """Start the background ingestion worker, replaying chunks left pending by a previous run"""
+        self.pending_path = Path(config.VECTOR_DB_PATH) / "pending"
+        self.pending_path.mkdir(parents=True, exist_ok=True)
+        self._ingest_queue = queue.Queue()
+        
+        pending_files = sorted(self.pending_path.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for pending_file in pending_files:
+            self._ingest_queue.put(pending_file)
+        if pending_files:
+            self.log_info(f"Resuming ingestion of {len(pending_files)} pending documents")
+        
+        threading.Thread(target=self._ingest_worker, name="vector-ingest", daemon=True).start()
+    
+    def _enqueue_chunk_records(self, document_id: str, texts: List[str], chunk_ids: List[str],
+                               metadatas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Persist prepared chunk records and queue them for the ingestion worker
+        
+        Returns:
+            Dictionary with queueing result
+        """
+        pending_file = self.pending_path / f"{document_id}.json"
+        tmp_file = pending_file.with_suffix(".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"document_id": document_id, "texts": texts, "chunk_ids": chunk_ids, "metadatas": metadatas}, f)
+        tmp_file.replace(pending_file)
+        
+        # A new upload starts over any earlier failure of the same document
+        self._ingest_failures.pop(document_id, None)
+        self._ingest_queue.put(pending_file)
+        self.log_info(f"Queued {len(texts)} chunks for document {document_id}")
+        
+        return self.success_response(
+            data={
+                "status": "queued",
+                "stored_count": 0,
+                "queued_count": len(texts),
+                "document_id": document_id
+            },
+            message=f"{len(texts)} chunks enfileirados para o banco vetorial"
+        )
+    
+    def _ingest_worker(self):
+        """Embed and store queued documents, grouping those that arrive close together"""
+        while True:
+            pending_files = [self._ingest_queue.get()]
+            deadline = time.monotonic() + config.INGEST_QUEUE_BATCH_WAIT
+            while len(pending_files) < _INGEST_MAX_DOCUMENTS:
+                try:
+                    pending_files.append(self._ingest_queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
             
-            # Update document with vector IDs
-            vector_ids = chunk_ids
+            try:
+                self._ingest_pending(pending_files)
+            finally:
+                for _ in pending_files:
+                    self._ingest_queue.task_done()
+    
+    def _ingest_pending(self, pending_files: List[Path]):
+        """Embed the chunks of several pending documents together and store them"""
+        records = []
+        for pending_file in pending_files:
+            try:
+                with open(pending_file, 'r', encoding='utf-8') as f:
+                    records.append((pending_file, json.load(f)))
+            except FileNotFoundError:
+                # The document was deleted while it was queued
+                continue
+            except (OSError, ValueError) as e:
+                self._ingest_failed(pending_file, pending_file.stem, e)
+        
+        if not records:
+            return
+        
+        # One embedding pass for every queued document
+        try:
+            embeddings = self.create_embeddings([text for _, record in records for text in record["texts"]])
+        except Exception as e:
+            for pending_file, record in records:
+                self._ingest_failed(pending_file, record["document_id"], e)
+            return
+        
+        offset = 0
+        for pending_file, record in records:
+            count = len(record["texts"])
+            document_embeddings = embeddings[offset:offset + count]
+            offset += count
             
-            self.log_info(f"Stored {len(chunks)} chunks for document {document.id}")
+            try:
+                # Checked and stored under the lock delete_document_vectors takes, so deleted documents stay deleted
+                with self._pending_lock:
+                    if not pending_file.exists():
+                        continue
+                    self._add_chunk_records(record["document_id"], record["texts"], record["chunk_ids"],
+                                            record["metadatas"], document_embeddings)
+                    pending_file.unlink(missing_ok=True)
+                    self._ingest_failures.pop(record["document_id"], None)
+            except Exception as e:
+                self._ingest_failed(pending_file, record["document_id"], e)
+    
+    def _ingest_failed(self, pending_file: Path, document_id: str, error: Exception):
+        """Record a failed ingestion and requeue it with exponential backoff while retries remain"""
+        attempts = self._ingest_failures.get(document_id, {}).get("attempts", 0) + 1
+        retrying = attempts <= config.INGEST_QUEUE_MAX_RETRIES
+        self._ingest_failures[document_id] = {
+            "status": "retrying" if retrying else "failed",
+            "error": str(error),
+            "attempts": attempts
+        }
+        
+        if not retrying:
+            self.log_error(f"Background ingestion of document {document_id} failed {attempts} times, "
+                           f"chunks stay pending until restart", error)
+            return
+        
+        delay = min(_INGEST_RETRY_MAX_DELAY, _INGEST_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+        self.log_warning(f"Background ingestion of document {document_id} failed ({str(error)}), retrying in {delay:.0f}s")
+        timer = threading.Timer(delay, self._ingest_queue.put, args=(pending_file,))
+        timer.daemon = True
+        timer.start()
+    
+    def get_ingest_status(self, document_id: str) -> Dict[str, Any]:
+        """
+        Report the background ingestion state of a document
+        
+        Args:
+            document_id: Document ID
+            
+        Returns:
+            Dictionary with status "queued", "retrying", "failed" or "stored", plus the last error
+        """
+        try:
+            failure = self._ingest_failures.get(document_id)
+            if failure is not None:
+                status = dict(failure)
+            elif self.pending_path is not None and (self.pending_path / f"{document_id}.json").exists():
+                status = {"status": "queued"}
+            else:
+                status = {"status": "stored"}
             
             return self.success_response(
-                data={
-                    "stored_count": len(chunks),
-                    "document_id": document.id
-                },
-                message=f"Armazenados {len(chunks)} chunks no banco vetorial"
+                data={"document_id": document_id, **status},
+                message=f"Status de ingestão: {status['status']}"
             )
             
+        except Exception as e:
+            return self.handle_error(e, "get ingest status")
+    
+    def flush_ingest_queue(self):
+        """Block until every queued document has been processed"""
+        if self._ingest_queue is not None:
+            self._ingest_queue.join()
+    
+    def store_document_chunks_batch(self, document: Document, chunks: List[DocumentSection]) -> Dict[str, Any]:
+        """
+        Store document chunks embedding them through the OpenAI Batch API
+        
+        Blocks until the batch completes; intended for bulk ingestion. After
+        OPENAI_BATCH_MAX_WAIT seconds the batch is cancelled and the chunks are
+        embedded directly.
+        
+        Args:
+            document: Document model
+            chunks: List of document sections/chunks
+            
+        Returns:
+            Dictionary with storage result
+        """
+        try:
+            if not chunks:
+                return self.success_response(
+                    data={"stored_count": 0},
+                    message="No chunks to store"
+                )
+            
+            if self.batch_embedding_service is None:
+                self.batch_embedding_service = BatchEmbeddingService(self.openai_client)
+            
+            texts, chunk_ids, metadatas = self._prepare_chunk_records(document, chunks)
+            
+            # Create embeddings through the Batch API, reusing cached vectors for known chunks
+            try:
+                embeddings = self._embed_with_cache(texts, self.batch_embedding_service.create_embeddings)
+            except Exception as e:
+                # Slow, failed or incomplete batches all fall back to the regular embeddings API
+                self.log_warning(f"Batch embedding failed ({str(e)}), embedding the chunks directly")
+                embeddings = self.create_embeddings(texts)
+            
+            return self._add_chunk_records(document.id, texts, chunk_ids, metadatas, embeddings)
+            
+        except Exception as e:
+            return self.handle_error(e, "batch document chunk storage")
+    
+    async def astore_document_chunks(self, document: Document, chunks: List[DocumentSection]) -> Dict[str, Any]:
+        """
+        Store document chunks in vector database, embedding batches concurrently
+        
+        Args:
+            document: Document model
+            chunks: List of document sections/chunks
+            
+        Returns:
+            Dictionary with storage result
+        """
+        try:
+            if not chunks:
+                return self.success_response(
+                    data={"stored_count": 0},
+                    message="No chunks to store"
+                )
+            
+            texts, chunk_ids, metadatas = self._prepare_chunk_records(document, chunks)
+            
+            # Hand the chunks to the background worker when ingestion is queued
+            if self._ingest_queue is not None:
+                return self._enqueue_chunk_records(document.id, texts, chunk_ids, metadatas)
+            
+            # Create embeddings concurrently, reusing cached vectors for known chunks
+            embeddings = await self._aembed_with_cache(texts)
+            
+            return self._add_chunk_records(document.id, texts, chunk_ids, metadatas, embeddings)
+            
         except Exception as e:
             return self.handle_error(e, "document chunk storage")
     
-    def semantic_search(self, query: str, document_id: Optional[str] = None, top_k: int = 5) -> Dict[str, Any]:
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Create the embedding for a single search query
+        
+        Args:
+            query: Search query
+            
+        Returns:
+            Embedding vector
+        """
+        return self.create_embeddings([query])[0]
+    
+    def semantic_search(self, query: str, document_id: Optional[str] = None, top_k: int = 5,
+                        min_similarity: float = 0.0, query_embedding: Optional[List[float]] = None) -> Dict[str, Any]:
         """
         Perform semantic search in the vector database
         
@@ -156,42 +719,26 @@ class VectorService(BaseService):
             query: Search query
             document_id: Optional document ID to filter results
             top_k: Number of top results to return
+            min_similarity: Minimum relevance score a result must reach
+            query_embedding: Precomputed query embedding, created from query when omitted
             
         Returns:
             Dictionary with search results
         """
         try:
             # Create query embedding
-            query_embedding = self.create_embeddings([query])[0]
-            
-            # Prepare where clause for filtering
-            where_clause = None
-            if document_id:
-                where_clause = {"document_id": document_id}
-            
-            # Perform search
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                where=where_clause,
-                include=["documents", "metadatas", "distances"]
-            )
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
             
-            # Process results
-            search_results = []
-            if results["documents"] and results["documents"][0]:
-                for i, (doc, metadata, distance) in enumerate(zip(
-                    results["documents"][0],
-                    results["metadatas"][0],
-                    results["distances"][0]
-                )):
-                    result = {
-                        "content": doc,
-                        "metadata": metadata,
-                        "relevance_score": 1 - distance,  # Convert distance to similarity
-                        "rank": i + 1
-                    }
-                    search_results.append(result)
+            # Near-identical queries over the same scope reuse the earlier results
+            search_scope = f"{document_id}:{top_k}:{min_similarity}"
+            search_results = self.search_cache.get(search_scope, query_embedding) if self.search_cache else None
+            if search_results is None:
+                search_results = self._query_collection(query_embedding, document_id, top_k, min_similarity)
+                if self.search_cache:
+                    self.search_cache.put(search_scope, query_embedding, search_results)
+            else:
+                self.log_info("Semantic search served from the search cache")
             
             self.log_info(f"Semantic search returned {len(search_results)} results")
             
@@ -207,6 +754,69 @@ class VectorService(BaseService):
         except Exception as e:
             return self.handle_error(e, "semantic search")
     
+    def _query_collection(self, query_embedding: List[float], document_id: Optional[str], top_k: int,
+                          min_similarity: float) -> List[Dict[str, Any]]:
+        """
+        Run a vector query against the collection
+        
+        Returns:
+            Ranked results that reach min_similarity
+        """
+        # Prepare where clause for filtering
+        where_clause = None
+        if document_id:
+            where_clause = {"document_id": document_id}
+        
+        # Perform search
+        results = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=top_k,
+            where=where_clause,
+            include=["documents", "metadatas", "distances"]
+        )
+        
+        # Process results (squared L2 between unit-length embeddings is 2 - 2cos, cosine distance is 1 - cos)
+        l2_space = self.distance_space == "l2"
+        search_results = []
+        if results["documents"] and results["documents"][0]:
+            for i, (doc, metadata, distance) in enumerate(zip(
+                results["documents"][0],
+                results["metadatas"][0],
+                results["distances"][0]
+            )):
+                # Convert distance to cosine similarity
+                relevance_score = 1 - distance / 2 if l2_space else 1 - distance
+                
+                # Results are sorted by distance, so everything after this one is less relevant
+                if relevance_score < min_similarity:
+                    break
+                
+                result = {
+                    "content": doc,
+                    "metadata": metadata,
+                    "relevance_score": relevance_score,
+                    "rank": i + 1
+                }
+                search_results.append(result)
+        
+        return search_results
+    
+    def add_change_listener(self, callback: Callable[[Optional[str]], None]):
+        """
+        Register a callback run whenever vectors are stored, deleted or reset
+        
+        Args:
+            callback: Called with the changed document ID, or None when the whole collection changed
+        """
+        self._change_listeners.append(callback)
+    
+    def _vectors_changed(self, document_id: Optional[str]):
+        """Drop cached search results and notify listeners after the collection changed"""
+        if self.search_cache:
+            self.search_cache.invalidate()
+        for callback in self._change_listeners:
+            callback(document_id)
+    
     def get_document_chunks(self, document_id: str) -> Dict[str, Any]:
         """
         Get all chunks for a specific document
@@ -235,8 +845,8 @@ class VectorService(BaseService):
                     }
                     chunks.append(chunk)
             
-            # Sort by chunk_id for consistent ordering
-            chunks.sort(key=lambda x: x["chunk_id"])
+            # Sort in document order (chunk_id strings would put chunk_10 before chunk_2)
+            chunks.sort(key=lambda x: _chunk_order(x["metadata"]))
             
             return self.success_response(
                 data={
@@ -261,16 +871,26 @@ class VectorService(BaseService):
             Dictionary with deletion result
         """
         try:
-            # Get all chunk IDs for the document
-            results = self.collection.get(
-                where={"document_id": document_id},
-                include=["metadatas"]
-            )
+            with self._pending_lock:
+                # Chunks still waiting in the ingestion queue are dropped with the document
+                if self.pending_path is not None:
+                    (self.pending_path / f"{document_id}.json").unlink(missing_ok=True)
+                self._ingest_failures.pop(document_id, None)
+                
+                # Get all chunk IDs for the document, without loading their metadata
+                results = self.collection.get(
+                    where={"document_id": document_id},
+                    include=[]
+                )
+                
+                if results["ids"]:
+                    # Delete the chunks
+                    self.collection.delete(ids=results["ids"])
             
             if results["ids"]:
-                # Delete the chunks
-                self.collection.delete(ids=results["ids"])
                 deleted_count = len(results["ids"])
+                self.removal_generation += 1
+                self._vectors_changed(document_id)
                 
                 self.log_info(f"Deleted {deleted_count} vectors for document {document_id}")
                 
@@ -334,14 +954,14 @@ class VectorService(BaseService):
             Dictionary with reset result
         """
         try:
-            # Delete the collection
-            self.client.delete_collection(name="contract_documents")
-            
-            # Recreate the collection
-            self.collection = self.client.get_or_create_collection(
-                name="contract_documents",
-                metadata={"description": "Contract documents for semantic search"}
-            )
+            with self._pending_lock:
+                # Delete the collection
+                self.client.delete_collection(name=_COLLECTION_NAME)
+                
+                # Recreate the collection, now in cosine space
+                self.collection = self._open_collection()
+            self.removal_generation += 1
+            self._vectors_changed(None)
             
             self.log_info("Vector collection reset successfully")
             
@@ -367,21 +987,31 @@ class VectorService(BaseService):
                 "total_documents": 0
             }
             
-            # Check ChromaDB connection
-            try:
-                collections = self.client.list_collections()
+            now = time.monotonic()
+            
+            # Check ChromaDB connection, reusing a recent successful probe
+            if self._chromadb_last_ok is not None and now - self._chromadb_last_ok < _CHROMADB_HEALTH_TTL:
                 health_status["chromadb_connected"] = True
-            except Exception:
-                pass
+            else:
+                try:
+                    collections = self.client.list_collections()
+                    health_status["chromadb_connected"] = True
+                    self._chromadb_last_ok = now
+                except Exception:
+                    pass
             
-            # Check OpenAI connection
-            try:
-                if self.openai_client:
-                    # Try a small embedding request
-                    self.create_embeddings(["test"])
-                    health_status["openai_connected"] = True
-            except Exception:
-                pass
+            # Check OpenAI connection, reusing a recent successful probe
+            if self._openai_last_ok is not None and now - self._openai_last_ok < _OPENAI_HEALTH_TTL:
+                health_status["openai_connected"] = True
+            else:
+                try:
+                    if self.openai_client:
+                        # Try a small embedding request, bypassing the embedding cache
+                        self._request_embeddings(["test"])
+                        health_status["openai_connected"] = True
+                        self._openai_last_ok = now
+                except Exception:
+                    pass
             
             # Check collection access
             try:
@@ -61,7 +61,7 @@ def test_pdf_with_images():
                 
                 # Processing method
                 if metadata.get("fallback_used"):
-                    print("⚙️ Método: PyPDF2 (fallback)")
+                    print("⚙️ Método: pypdfium2 (fallback)")
                 else:
                     print("⚙️ Método: PyMuPDF (completo)")
                 
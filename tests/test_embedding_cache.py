@@ -0,0 +1,54 @@
+"""
+Unit tests for the persistent embedding cache
+"""
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+
+from utils.embedding_cache import EmbeddingCache, get_text_hash
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Test embedding cache functionality"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = EmbeddingCache(Path(self.temp_dir) / "embed_cache.sqlite")
+    
+    def tearDown(self):
+        """Clean up test fixtures"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_text_hash_normalizes_whitespace(self):
+        """Test that whitespace differences produce the same hash"""
+        self.assertEqual(
+            get_text_hash("Cláusula 1  - SLA\n de 4 horas "),
+            get_text_hash("Cláusula 1 - SLA de 4 horas")
+        )
+        self.assertNotEqual(get_text_hash("SLA de 4 horas"), get_text_hash("SLA de 8 horas"))
+    
+    def test_put_and_get_many(self):
+        """Test storing and retrieving embeddings"""
+        self.cache.put_many("model-a", {"hash1": [0.5, 0.25], "hash2": [1.0, -1.0]})
+        
+        result = self.cache.get_many("model-a", ["hash1", "hash2", "missing"])
+        
+        self.assertEqual(result, {"hash1": [0.5, 0.25], "hash2": [1.0, -1.0]})
+    
+    def test_cache_is_scoped_by_model(self):
+        """Test that embeddings from another model are not returned"""
+        self.cache.put_many("model-a", {"hash1": [0.5, 0.25]})
+        
+        self.assertEqual(self.cache.get_many("model-b", ["hash1"]), {})
+    
+    def test_cache_persists_across_instances(self):
+        """Test that embeddings survive reopening the cache"""
+        self.cache.put_many("model-a", {"hash1": [0.5, 0.25]})
+        
+        reopened = EmbeddingCache(Path(self.temp_dir) / "embed_cache.sqlite")
+        
+        self.assertEqual(reopened.get_many("model-a", ["hash1"]), {"hash1": [0.5, 0.25]})
+
+if __name__ == '__main__':
+    unittest.main()
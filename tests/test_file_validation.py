@@ -3,12 +3,17 @@ Unit tests for file validation functionality
 """
 import unittest
 import tempfile
+import shutil
 import os
+from io import BytesIO
 from pathlib import Path
+from unittest.mock import patch
+
+from config import config
 
 from utils.file_utils import (
     validate_file_type, validate_file_size, get_file_hash,
-    generate_safe_filename, get_file_info
+    generate_safe_filename, get_file_info, copy_stream_with_hash
 )
 from services.document_service import DocumentService
 
@@ -17,6 +22,13 @@ class TestFileValidation(unittest.TestCase):
     
     def setUp(self):
         """Set up test fixtures"""
+        # Uploads and the hash index go to a fresh directory, so no run sees files from an earlier one
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, ignore_errors=True)
+        upload_patch = patch.object(config, "UPLOAD_FOLDER", self.upload_dir)
+        upload_patch.start()
+        self.addCleanup(upload_patch.stop)
+        
         self.document_service = DocumentService()
         self.test_content = b"Test file content for validation"
     
@@ -94,6 +106,17 @@ class TestFileValidation(unittest.TestCase):
         self.assertEqual(len(hash1), 32)
         self.assertTrue(all(c in '0123456789abcdef' for c in hash1))
     
+    def test_copy_stream_with_hash(self):
+        """Test streamed copy produces the same hash and bytes as the content"""
+        content = os.urandom(200 * 1024)  # Spans several buffer reads
+        destination = BytesIO()
+        
+        file_hash, size = copy_stream_with_hash(BytesIO(content), destination)
+        
+        self.assertEqual(file_hash, get_file_hash(content))
+        self.assertEqual(size, len(content))
+        self.assertEqual(destination.getvalue(), content)
+    
     def test_generate_safe_filename(self):
         """Test safe filename generation"""
         test_cases = [
@@ -151,6 +174,13 @@ class TestDocumentService(unittest.TestCase):
     
     def setUp(self):
         """Set up test fixtures"""
+        # Uploads and the hash index go to a fresh directory, so no run sees files from an earlier one
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, ignore_errors=True)
+        upload_patch = patch.object(config, "UPLOAD_FOLDER", self.upload_dir)
+        upload_patch.start()
+        self.addCleanup(upload_patch.stop)
+        
         self.document_service = DocumentService()
         self.test_content = b"Test contract content for upload testing"
     
@@ -195,6 +225,35 @@ class TestDocumentService(unittest.TestCase):
             if file_path.exists():
                 file_path.unlink()
     
+    def test_upload_document_deduplicates_by_content(self):
+        """Test identical content reuses the stored document and different content does not"""
+        first = self.document_service.upload_document(self.test_content, "contract.pdf", "test_user")
+        repeat = self.document_service.upload_document(self.test_content, "contract_copy.pdf", "test_user")
+        other = self.document_service.upload_document(b"Another contract", "contract.pdf", "test_user")
+        
+        self.assertEqual(first["message"], "Arquivo enviado com sucesso")
+        self.assertEqual(repeat["message"], "Arquivo já existe no sistema")
+        self.assertEqual(repeat["data"]["document"]["id"], first["data"]["document"]["id"])
+        self.assertEqual(repeat["data"]["file_path"], first["data"]["file_path"])
+        
+        self.assertEqual(other["message"], "Arquivo enviado com sucesso")
+        self.assertNotEqual(other["data"]["document"]["id"], first["data"]["document"]["id"])
+        
+        # The index is persisted in the upload folder, so a new service still finds the duplicate
+        reloaded = DocumentService().upload_document(self.test_content, "contract.pdf", "test_user")
+        self.assertEqual(reloaded["data"]["document"]["id"], first["data"]["document"]["id"])
+        self.assertEqual(sorted(os.listdir(self.upload_dir)), sorted(
+            [".hash_index.json", first["data"]["safe_filename"], other["data"]["safe_filename"]]
+        ))
+    
+    def test_get_document_path_skips_sidecar_files(self):
+        """Test that the hash index and in-flight uploads are never resolved as documents"""
+        result = self.document_service.upload_document(self.test_content, "sidecar_contract.pdf", "test_user")
+        self.addCleanup(Path(result["data"]["file_path"]).unlink, missing_ok=True)
+        
+        self.assertIsNone(self.document_service.get_document_path("zzzzzzzz-none", ".hash_index.json"))
+        self.assertIsNone(self.document_service.get_document_path("zzzzzzzz-none", ".upload"))
+    
     def test_upload_document_invalid_type(self):
         """Test document upload with invalid file type"""
         filename = "test_image.jpg"
@@ -0,0 +1,32 @@
+"""
+Unit tests for query intent scoring
+"""
+import re
+import unittest
+
+from services.query_service import _INTENT_ANCHORS, _INTENT_PATTERN_SOURCES, _score_intents
+
+class TestQueryIntent(unittest.TestCase):
+    """Test intent scoring functionality"""
+    
+    def test_every_pattern_has_an_anchor(self):
+        """Test that the anchor prefilter cannot hide a pattern match"""
+        for patterns in _INTENT_PATTERN_SOURCES.values():
+            for pattern in patterns:
+                literal = re.sub(r'\\b|\.\*', ' ', pattern)
+                with self.subTest(pattern=pattern):
+                    self.assertTrue(any(anchor in literal for anchor in _INTENT_ANCHORS))
+    
+    def test_off_topic_question_has_no_intents(self):
+        """Test that a question without anchors scores no intent"""
+        self.assertEqual(_score_intents("como faço para abrir um chamado no portal?"), ())
+    
+    def test_on_topic_question_is_scored(self):
+        """Test that matching questions are still scored"""
+        scores = dict(_score_intents("qual o número do contrato de fibra?"))
+        
+        self.assertIn("fiber_query", scores)
+        self.assertIn("contract_info", scores)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Unit tests for the semantic answer cache
+"""
+import unittest
+
+from utils.semantic_cache import SemanticCache
+
+class TestSemanticCache(unittest.TestCase):
+    """Test semantic cache functionality"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.cache = SemanticCache(threshold=0.95, max_entries=2)
+    
+    def test_similar_question_hits(self):
+        """Test that a near-identical embedding returns the cached answer"""
+        self.cache.put("doc-1", [1.0, 0.0, 0.0], {"answer": "4 horas"})
+        
+        self.assertEqual(self.cache.get("doc-1", [0.99, 0.05, 0.0]), {"answer": "4 horas"})
+        self.assertIsNone(self.cache.get("doc-1", [0.0, 1.0, 0.0]))
+    
+    def test_cache_is_scoped_by_document(self):
+        """Test that answers from another document are not returned"""
+        self.cache.put("doc-1", [1.0, 0.0], {"answer": "4 horas"})
+        
+        self.assertIsNone(self.cache.get("doc-2", [1.0, 0.0]))
+    
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cap evicts the least recently used answer"""
+        self.cache.put("doc-1", [1.0, 0.0, 0.0], "a")
+        self.cache.put("doc-1", [0.0, 1.0, 0.0], "b")
+        
+        # Touch "a" so "b" becomes the least recently used entry
+        self.assertEqual(self.cache.get("doc-1", [1.0, 0.0, 0.0]), "a")
+        self.cache.put("doc-1", [0.0, 0.0, 1.0], "c")
+        
+        self.assertEqual(self.cache.get("doc-1", [1.0, 0.0, 0.0]), "a")
+        self.assertIsNone(self.cache.get("doc-1", [0.0, 1.0, 0.0]))
+        self.assertEqual(self.cache.get("doc-1", [0.0, 0.0, 1.0]), "c")
+    
+    def test_cache_is_scoped_by_settings(self):
+        """Test that answers stored with other retrieval settings are not returned"""
+        self.cache.put("doc-1", [1.0, 0.0], "top 5", scope="5:0.0")
+        
+        self.assertIsNone(self.cache.get("doc-1", [1.0, 0.0], scope="3:0.5"))
+        self.assertEqual(self.cache.get("doc-1", [1.0, 0.0], scope="5:0.0"), "top 5")
+    
+    def test_invalidate_document(self):
+        """Test that invalidation drops the answers of a document in every scope"""
+        self.cache.put("doc-1", [1.0, 0.0], "a")
+        self.cache.put("doc-1", [1.0, 0.0], "b", scope="3:0.5")
+        self.cache.put("doc-2", [1.0, 0.0], "c")
+        self.cache.invalidate("doc-1")
+        
+        self.assertIsNone(self.cache.get("doc-1", [1.0, 0.0]))
+        self.assertIsNone(self.cache.get("doc-1", [1.0, 0.0], scope="3:0.5"))
+        self.assertEqual(self.cache.get("doc-2", [1.0, 0.0]), "c")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,8 +7,10 @@ import os
 from pathlib import Path
 from io import BytesIO
 
-from services.text_extraction_service import TextExtractionService
-from models.document import Document, FileType, DocumentStatus
+from PIL import Image, ImageEnhance
+
+from services.text_extraction_service import TextExtractionService, _contrast_table, _otsu_threshold
+from models.document import Document, DocumentSection, FileType, DocumentStatus
 
 class TestTextExtractionService(unittest.TestCase):
     """Test text extraction service functionality"""
@@ -47,6 +49,28 @@ class TestTextExtractionService(unittest.TestCase):
         self.assertFalse(cleaned.startswith(" "))  # No leading space
         self.assertFalse(cleaned.endswith(" "))  # No trailing space
     
+    def test_otsu_threshold_separates_bimodal_histogram(self):
+        """Test Otsu threshold falls between dark text and light background"""
+        histogram = [0] * 256
+        histogram[30] = 200   # text pixels
+        histogram[220] = 800  # background pixels
+        
+        threshold = _otsu_threshold(histogram)
+        
+        self.assertGreaterEqual(threshold, 30)
+        self.assertLess(threshold, 220)
+        self.assertEqual(_otsu_threshold([0] * 256), 127)
+    
+    def test_contrast_table_matches_image_enhance(self):
+        """Test the contrast lookup table reproduces ImageEnhance.Contrast"""
+        image = Image.new("L", (256, 4))
+        image.putdata([value for value in range(256)] * 2 + [40] * 512)
+        
+        expected = ImageEnhance.Contrast(image).enhance(1.2)
+        actual = image.point(_contrast_table(image.histogram(), 1.2))
+        
+        self.assertEqual(actual.tobytes(), expected.tobytes())
+    
     def test_create_text_chunks(self):
         """Test text chunking functionality"""
         chunks = self.text_service._create_text_chunks(self.test_text)
@@ -59,6 +83,17 @@ class TestTextExtractionService(unittest.TestCase):
             self.assertIsNotNone(chunk.section_id)
             self.assertTrue(chunk.section_id.startswith("chunk_"))
     
+    def test_create_text_chunks_prepends_section_header(self):
+        """Test chunks starting inside a clause carry that clause header"""
+        self.text_service.chunk_size = 50
+        self.text_service.chunk_overlap = 0
+        text = self.text_service._clean_text(self.test_text)
+        
+        chunks = self.text_service._create_text_chunks(text)
+        
+        self.assertFalse(chunks[0].content.startswith("["))
+        self.assertTrue(any(chunk.content.startswith("[CLÁUSULA 2]") for chunk in chunks))
+    
     def test_extract_contract_specific_info(self):
         """Test contract-specific information extraction"""
         result = self.text_service.extract_contract_specific_info(self.test_text)
@@ -158,6 +193,10 @@ class TestTextExtractionService(unittest.TestCase):
             self.assertIn("metadata", processed_doc)
             self.assertIn("stats", processed_doc)
             
+            # Section models are handed over alongside their dumps
+            self.assertEqual(len(processed_doc["chunk_models"]), len(processed_doc["chunks"]))
+            self.assertTrue(all(isinstance(chunk, DocumentSection) for chunk in processed_doc["chunk_models"]))
+            
         finally:
             if temp_path.exists():
                 temp_path.unlink()
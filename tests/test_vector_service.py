@@ -2,24 +2,48 @@
 Unit tests for vector service functionality
 """
 import unittest
+import asyncio
+import time
 import tempfile
+import shutil
 import os
 from pathlib import Path
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, AsyncMock, MagicMock, patch
 
 from services.vector_service import VectorService
+from services.batch_embedding_service import BatchEmbeddingService
+from utils.embedding_cache import EmbeddingCache
+from utils.semantic_cache import SemanticCache
+from utils.embedding_tokens import truncate_embedding_input
 from models.document import Document, DocumentSection, FileType, DocumentStatus
 
+class _CharEncoding:
+    """Offline stand-in for the cl100k_base tokenizer, mapping each character to a fixed number of tokens"""
+    
+    def __init__(self, tokens_per_char: int = 1):
+        self.tokens_per_char = tokens_per_char
+    
+    def encode(self, text, **kwargs):
+        return [(char, i) for char in text for i in range(self.tokens_per_char)]
+    
+    def decode(self, tokens):
+        return "".join(char for char, i in tokens if i == self.tokens_per_char - 1)
+
 class TestVectorService(unittest.TestCase):
     """Test vector service functionality"""
     
     def setUp(self):
         """Set up test fixtures"""
+        # Embedding cache files go to a fresh directory, so no run reads vectors cached by an earlier one
+        self.temp_db = tempfile.TemporaryDirectory()
+        
         # Mock the config to avoid requiring actual API keys for tests
         with patch('services.vector_service.config') as mock_config:
-            mock_config.VECTOR_DB_PATH = "./test_chroma_db"
+            mock_config.VECTOR_DB_PATH = self.temp_db.name
             mock_config.OPENAI_API_KEY = "test_key"
             mock_config.OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+            mock_config.SEARCH_CACHE_ENABLED = False
+            mock_config.INGEST_QUEUE_ENABLED = False
             
             # Mock OpenAI client
             with patch('services.vector_service.OpenAI') as mock_openai:
@@ -36,6 +60,7 @@ class TestVectorService(unittest.TestCase):
                     mock_chroma_client = Mock()
                     mock_collection = Mock()
                     mock_chroma_client.get_or_create_collection.return_value = mock_collection
+                    mock_chroma_client.get_collection.side_effect = ValueError("Collection contract_documents does not exist.")
                     mock_chromadb.PersistentClient.return_value = mock_chroma_client
                     
                     self.vector_service = VectorService()
@@ -68,6 +93,85 @@ class TestVectorService(unittest.TestCase):
             )
         ]
     
+    def tearDown(self):
+        """Clean up test fixtures"""
+        self.vector_service.embedding_cache = None
+        self.temp_db.cleanup()
+    
+    def test_collection_uses_cosine_space(self):
+        """Test the collection is created with cosine distance"""
+        call_args = self.vector_service.client.get_or_create_collection.call_args
+        
+        self.assertEqual(call_args.kwargs["metadata"]["hnsw:space"], "cosine")
+    
+    def test_existing_l2_collection_is_not_relabelled(self):
+        """Test an existing L2 collection keeps its metadata and its distances become cosine similarity"""
+        l2_collection = Mock(metadata={"description": "Contract documents for semantic search"})
+        l2_collection.count.return_value = 1
+        l2_collection.get.return_value = {"ids": ["chunk_1"], "embeddings": [[0.1] * 512]}
+        l2_collection.query.return_value = {
+            "documents": [["Result"]],
+            "metadatas": [[{"document_id": "doc1", "chunk_id": "chunk_1"}]],
+            "distances": [[0.4]]
+        }
+        self.vector_service.client.get_collection.side_effect = None
+        self.vector_service.client.get_collection.return_value = l2_collection
+        self.vector_service.client.get_or_create_collection.reset_mock()
+        
+        with patch.multiple('services.vector_service.config', OPENAI_EMBEDDING_MODEL="text-embedding-3-small",
+                            OPENAI_EMBEDDING_DIMS=512), \
+             self.assertLogs("VectorService", level="WARNING"):
+            self.vector_service.collection = self.vector_service._open_collection()
+        
+        self.vector_service.client.get_or_create_collection.assert_not_called()
+        self.assertEqual(self.vector_service.distance_space, "l2")
+        result = self.vector_service.semantic_search("sla", query_embedding=[1.0, 0.0])
+        self.assertAlmostEqual(result["data"]["results"][0]["relevance_score"], 0.8)
+    
+    def test_new_collection_records_embedding_model(self):
+        """Test a new collection records the embedding model and dimension it is built for"""
+        with patch.multiple('services.vector_service.config', OPENAI_EMBEDDING_MODEL="text-embedding-3-small",
+                            OPENAI_EMBEDDING_DIMS=512):
+            self.vector_service.collection = self.vector_service._open_collection()
+        
+        metadata = self.vector_service.client.get_or_create_collection.call_args.kwargs["metadata"]
+        self.assertEqual(metadata["embedding_model"], "text-embedding-3-small:512")
+        self.assertEqual(metadata["embedding_dimensions"], 512)
+    
+    def test_collection_of_another_embedding_model_is_rejected(self):
+        """Test a non-empty collection built for another model or dimension fails with a clear error"""
+        old_collections = {
+            "recorded model": Mock(metadata={"hnsw:space": "cosine", "embedding_model": "text-embedding-ada-002"}),
+            "unrecorded 1536-dim vectors": Mock(metadata={"hnsw:space": "cosine"})
+        }
+        for label, old_collection in old_collections.items():
+            with self.subTest(label):
+                old_collection.count.return_value = 2
+                old_collection.get.return_value = {"ids": ["chunk_1"], "embeddings": [[0.1] * 1536]}
+                self.vector_service.client.get_collection.side_effect = None
+                self.vector_service.client.get_collection.return_value = old_collection
+                
+                with patch.multiple('services.vector_service.config', OPENAI_EMBEDDING_MODEL="text-embedding-3-small",
+                                    OPENAI_EMBEDDING_DIMS=512):
+                    with self.assertRaisesRegex(ValueError, "text-embedding-3-small:512"):
+                        self.vector_service._open_collection()
+                
+                self.vector_service.client.delete_collection.assert_not_called()
+    
+    def test_empty_collection_of_another_embedding_model_is_recreated(self):
+        """Test an empty collection built for another model is re-created for the configured one"""
+        old_collection = Mock(metadata={"hnsw:space": "cosine", "embedding_model": "text-embedding-ada-002"})
+        old_collection.count.return_value = 0
+        self.vector_service.client.get_collection.side_effect = None
+        self.vector_service.client.get_collection.return_value = old_collection
+        
+        with patch.multiple('services.vector_service.config', OPENAI_EMBEDDING_MODEL="text-embedding-3-small",
+                            OPENAI_EMBEDDING_DIMS=512):
+            collection = self.vector_service._open_collection()
+        
+        self.vector_service.client.delete_collection.assert_called_once_with(name="contract_documents")
+        self.assertIs(collection, self.mock_collection)
+    
     def test_create_embeddings(self):
         """Test embedding creation"""
         texts = ["test text 1", "test text 2"]
@@ -85,6 +189,114 @@ class TestVectorService(unittest.TestCase):
         self.assertEqual(embeddings, [])
         self.mock_openai_client.embeddings.create.assert_not_called()
     
+    def test_create_embeddings_reuses_cache(self):
+        """Test repeated texts are served from the embedding cache"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        self.vector_service.embedding_cache = EmbeddingCache(Path(temp_dir) / "embed_cache.sqlite")
+        self.mock_openai_client.embeddings.create.return_value = Mock(data=[Mock(embedding=[0.5, 0.25])])
+        
+        first = self.vector_service.create_embeddings(["qual o SLA?"])
+        second = self.vector_service.create_embeddings(["qual o  SLA?"])
+        
+        self.assertEqual(first, [[0.5, 0.25]])
+        self.assertEqual(second, first)
+        self.mock_openai_client.embeddings.create.assert_called_once()
+    
+    def test_request_embeddings_splits_batches(self):
+        """Test large inputs are split into several requests and keep input order"""
+        texts = [f"text {i}" for i in range(5)]
+        self.mock_openai_client.embeddings.create.side_effect = lambda input, **kwargs: Mock(
+            data=[Mock(embedding=[float(text.split()[1])]) for text in input]
+        )
+        
+        with patch('services.vector_service.config') as mock_config:
+            mock_config.OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+            mock_config.OPENAI_EMBEDDING_DIMS = 512
+            mock_config.EMBEDDING_BATCH_SIZE = 2
+            mock_config.EMBEDDING_MAX_CONCURRENCY = 4
+            embeddings = self.vector_service._request_embeddings(texts)
+        
+        self.assertEqual(embeddings, [[0.0], [1.0], [2.0], [3.0], [4.0]])
+        self.assertEqual(self.mock_openai_client.embeddings.create.call_count, 3)
+    
+    def test_request_embeddings_truncates_long_inputs(self):
+        """Test inputs beyond the model's limit are cut before they are sent"""
+        self.mock_openai_client.embeddings.create.return_value = Mock(data=[Mock(embedding=[0.1]), Mock(embedding=[0.2])])
+        
+        with patch('utils.embedding_tokens.get_embedding_encoding', return_value=_CharEncoding()):
+            self.vector_service._request_embeddings(["a" * 20000, "SLA"])
+        
+        sent = self.mock_openai_client.embeddings.create.call_args.kwargs["input"]
+        self.assertEqual([len(text) for text in sent], [8191, 3])
+    
+    def test_truncate_embedding_input_logs_original_length(self):
+        """Test truncating an embedding input is logged with its original length"""
+        with patch('utils.embedding_tokens.get_embedding_encoding', return_value=_CharEncoding()), \
+             self.assertLogs("utils.embedding_tokens", level="WARNING") as logs:
+            truncated = truncate_embedding_input("a" * 20000)
+        
+        self.assertEqual(len(truncated), 8191)
+        self.assertIn("20000", logs.output[0])
+    
+    def test_truncate_embedding_input_counts_multibyte_text_in_tokens(self):
+        """Test text shorter than the limit in characters is still cut when it has more tokens"""
+        encoding = _CharEncoding(tokens_per_char=3)
+        with patch('utils.embedding_tokens.get_embedding_encoding', return_value=encoding), \
+             self.assertLogs("utils.embedding_tokens", level="WARNING"):
+            truncated = truncate_embedding_input("\u2603" * 5000)
+        
+        self.assertEqual(len(encoding.encode(truncated)), 8190)
+        self.assertEqual(truncate_embedding_input("short text"), "short text")
+    
+    def test_acreate_embeddings_batches_concurrently(self):
+        """Test concurrent embedding creation keeps input order across batches"""
+        texts = [f"text {i}" for i in range(5)]
+        
+        async def fake_create(input, **kwargs):
+            return Mock(data=[Mock(embedding=[float(text.split()[1])]) for text in input])
+        
+        mock_async_client = MagicMock()
+        mock_async_client.__aenter__ = AsyncMock(return_value=mock_async_client)
+        mock_async_client.__aexit__ = AsyncMock(return_value=False)
+        mock_async_client.embeddings.create = AsyncMock(side_effect=fake_create)
+        
+        with patch('services.vector_service.AsyncOpenAI', return_value=mock_async_client), \
+             patch('services.vector_service.config') as mock_config:
+            mock_config.OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+            mock_config.OPENAI_EMBEDDING_DIMS = 512
+            mock_config.EMBEDDING_BATCH_SIZE = 2
+            mock_config.EMBEDDING_MAX_CONCURRENCY = 4
+            embeddings = asyncio.run(self.vector_service.acreate_embeddings(texts))
+        
+        self.assertEqual(embeddings, [[0.0], [1.0], [2.0], [3.0], [4.0]])
+        self.assertEqual(mock_async_client.embeddings.create.await_count, 3)
+        self.assertEqual(mock_async_client.embeddings.create.await_args.kwargs["dimensions"], 512)
+    
+    def test_acreate_embeddings_sorts_by_length(self):
+        """Test batches are grouped by text length and results keep input order"""
+        texts = ["a" * 5, "b", "c" * 3, "d" * 4, "e" * 2]
+        
+        async def fake_create(input, **kwargs):
+            return Mock(data=[Mock(embedding=[float(len(text))]) for text in input])
+        
+        mock_async_client = MagicMock()
+        mock_async_client.__aenter__ = AsyncMock(return_value=mock_async_client)
+        mock_async_client.__aexit__ = AsyncMock(return_value=False)
+        mock_async_client.embeddings.create = AsyncMock(side_effect=fake_create)
+        
+        with patch('services.vector_service.AsyncOpenAI', return_value=mock_async_client), \
+             patch('services.vector_service.config') as mock_config:
+            mock_config.OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+            mock_config.OPENAI_EMBEDDING_DIMS = 512
+            mock_config.EMBEDDING_BATCH_SIZE = 2
+            mock_config.EMBEDDING_MAX_CONCURRENCY = 4
+            embeddings = asyncio.run(self.vector_service.acreate_embeddings(texts))
+        
+        self.assertEqual(embeddings, [[5.0], [1.0], [3.0], [4.0], [2.0]])
+        batch_inputs = [call.kwargs["input"] for call in mock_async_client.embeddings.create.await_args_list]
+        self.assertEqual(sorted(batch_inputs), [["a" * 5], ["b", "e" * 2], ["c" * 3, "d" * 4]])
+    
     def test_store_document_chunks(self):
         """Test storing document chunks in vector database"""
         result = self.vector_service.store_document_chunks(self.test_document, self.test_chunks)
@@ -103,6 +315,116 @@ class TestVectorService(unittest.TestCase):
         self.assertEqual(len(call_args.kwargs["metadatas"]), 3)
         self.assertEqual(len(call_args.kwargs["ids"]), 3)
     
+    def test_store_document_chunks_queued(self):
+        """Test queued ingestion returns at once and the worker stores the chunks"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        
+        with patch.multiple('services.vector_service.config', VECTOR_DB_PATH=temp_dir, INGEST_QUEUE_BATCH_WAIT=0.0):
+            self.vector_service._start_ingest_worker()
+            
+            result = self.vector_service.store_document_chunks(self.test_document, self.test_chunks)
+            
+            self.assertTrue(result["success"])
+            self.assertEqual(result["data"]["status"], "queued")
+            self.assertEqual(result["data"]["queued_count"], 3)
+            
+            self.vector_service.flush_ingest_queue()
+        
+        self.mock_collection.add.assert_called_once()
+        self.assertEqual(len(self.mock_collection.add.call_args.kwargs["ids"]), 3)
+        self.assertEqual(list(Path(temp_dir, "pending").iterdir()), [])
+    
+    def test_queued_ingestion_retries_after_failure(self):
+        """Test a failed background ingestion is requeued until the chunks are stored"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        self.mock_openai_client.embeddings.create.side_effect = [
+            Exception("rate limited"), self.mock_openai_client.embeddings.create.return_value
+        ]
+        
+        with patch.multiple('services.vector_service.config', VECTOR_DB_PATH=temp_dir, INGEST_QUEUE_BATCH_WAIT=0.0,
+                            INGEST_QUEUE_MAX_RETRIES=3), \
+             patch('services.vector_service._INGEST_RETRY_BASE_DELAY', 0.0):
+            self.vector_service._start_ingest_worker()
+            self.vector_service.store_document_chunks(self.test_document, self.test_chunks)
+            
+            deadline = time.monotonic() + 5
+            while not self.mock_collection.add.called:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+            self.vector_service.flush_ingest_queue()
+            status = self.vector_service.get_ingest_status(self.test_document.id)["data"]
+        
+        self.assertEqual(status["status"], "stored")
+        self.assertEqual(self.mock_openai_client.embeddings.create.call_count, 2)
+        self.mock_collection.add.assert_called_once()
+    
+    def test_queued_ingestion_reports_failure_after_retries(self):
+        """Test a document is reported as failed once its retries are used up"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        self.mock_openai_client.embeddings.create.side_effect = Exception("rate limited")
+        
+        with patch.multiple('services.vector_service.config', VECTOR_DB_PATH=temp_dir, INGEST_QUEUE_BATCH_WAIT=0.0,
+                            INGEST_QUEUE_MAX_RETRIES=0):
+            self.vector_service._start_ingest_worker()
+            self.vector_service.store_document_chunks(self.test_document, self.test_chunks)
+            self.vector_service.flush_ingest_queue()
+            status = self.vector_service.get_ingest_status(self.test_document.id)["data"]
+        
+        self.assertEqual(status["status"], "failed")
+        self.assertEqual(status["error"], "rate limited")
+        self.assertTrue((Path(temp_dir) / "pending" / f"{self.test_document.id}.json").exists())
+        self.mock_collection.add.assert_not_called()
+    
+    def test_delete_during_queued_ingestion_keeps_document_deleted(self):
+        """Test chunks of a document deleted while they are embedded are never added"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        self.mock_collection.get.return_value = {"ids": []}
+        
+        def embed_then_delete(texts):
+            self.vector_service.delete_document_vectors(self.test_document.id)
+            return [[0.1, 0.2, 0.3] for _ in texts]
+        
+        with patch.multiple('services.vector_service.config', VECTOR_DB_PATH=temp_dir, INGEST_QUEUE_BATCH_WAIT=0.0), \
+             patch.object(self.vector_service, 'create_embeddings', side_effect=embed_then_delete):
+            self.vector_service._start_ingest_worker()
+            self.vector_service.store_document_chunks(self.test_document, self.test_chunks)
+            self.vector_service.flush_ingest_queue()
+        
+        self.mock_collection.add.assert_not_called()
+    
+    def test_store_document_chunks_batch_falls_back_on_timeout(self):
+        """Test a batch that outlives the wait limit is replaced by direct embedding"""
+        self.vector_service.batch_embedding_service = Mock()
+        self.vector_service.batch_embedding_service.create_embeddings.side_effect = TimeoutError("Batch b still in_progress")
+        
+        result = self.vector_service.store_document_chunks_batch(self.test_document, self.test_chunks)
+        
+        self.assertTrue(result["success"])
+        self.assertEqual(result["data"]["stored_count"], 3)
+        self.mock_openai_client.embeddings.create.assert_called_once()
+    
+    def test_failed_batch_is_forgotten_and_embedded_directly(self):
+        """Test a batch that ends failed leaves no state behind and falls back to direct embedding"""
+        batch_client = Mock()
+        batch_client.files.create.return_value = Mock(id="file-1")
+        batch_client.batches.create.return_value = Mock(id="batch-1")
+        batch_client.batches.retrieve.return_value = Mock(status="failed")
+        
+        with patch.multiple('services.batch_embedding_service.config', VECTOR_DB_PATH=self.temp_db.name,
+                            OPENAI_BATCH_MAX_WAIT=0):
+            self.vector_service.batch_embedding_service = BatchEmbeddingService(batch_client)
+            result = self.vector_service.store_document_chunks_batch(self.test_document, self.test_chunks)
+            state = self.vector_service.batch_embedding_service._load_state()
+        
+        self.assertTrue(result["success"])
+        self.assertEqual(result["data"]["stored_count"], 3)
+        self.mock_openai_client.embeddings.create.assert_called_once()
+        self.assertEqual(state, {})
+    
     def test_store_document_chunks_empty(self):
         """Test storing empty chunks list"""
         result = self.vector_service.store_document_chunks(self.test_document, [])
@@ -163,6 +485,42 @@ class TestVectorService(unittest.TestCase):
         self.assertTrue(result["success"])
         self.assertEqual(len(result["data"]["results"]), 0)
     
+    def test_semantic_search_reuses_cached_results(self):
+        """Test near-identical queries skip ChromaDB until the collection changes"""
+        self.vector_service.search_cache = SemanticCache(threshold=0.95)
+        self.mock_collection.query.return_value = {
+            "documents": [["Cached result"]],
+            "metadatas": [[{"document_id": "doc1", "chunk_id": "chunk_1"}]],
+            "distances": [[0.2]]
+        }
+        
+        first = self.vector_service.semantic_search("sla", document_id="doc1", query_embedding=[1.0, 0.0])
+        second = self.vector_service.semantic_search("SLA?", document_id="doc1", query_embedding=[0.99, 0.05])
+        
+        self.assertEqual(second["data"]["results"], first["data"]["results"])
+        self.assertEqual(second["data"]["query"], "SLA?")
+        self.mock_collection.query.assert_called_once()
+        
+        # Another scope and a write to the collection both go back to ChromaDB
+        self.vector_service.semantic_search("sla", document_id="doc1", top_k=3, query_embedding=[1.0, 0.0])
+        self.vector_service.store_document_chunks(self.test_document, self.test_chunks[:1])
+        self.vector_service.semantic_search("sla", document_id="doc1", query_embedding=[1.0, 0.0])
+        self.assertEqual(self.mock_collection.query.call_count, 3)
+    
+    def test_change_listeners_hear_vector_changes(self):
+        """Test listeners are told which document's vectors were stored, deleted or reset"""
+        changes = []
+        self.vector_service.add_change_listener(changes.append)
+        self.mock_collection.get.return_value = {"ids": ["doc1_chunk_1"]}
+        
+        self.vector_service.store_document_chunks(self.test_document, self.test_chunks[:1])
+        self.vector_service.delete_document_vectors("doc1")
+        self.vector_service.reset_collection()
+        
+        self.assertEqual(changes, [self.test_document.id, "doc1", None])
+        # Only the delete and the reset count as removals
+        self.assertEqual(self.vector_service.removal_generation, 2)
+    
     def test_get_document_chunks(self):
         """Test retrieving document chunks"""
         mock_results = {
@@ -185,6 +543,29 @@ class TestVectorService(unittest.TestCase):
         call_args = self.mock_collection.get.call_args
         self.assertEqual(call_args.kwargs["where"], {"document_id": "doc1"})
     
+    def test_get_document_chunks_in_document_order(self):
+        """Test chunks are ordered by position, not by chunk_id string"""
+        self.mock_collection.get.return_value = {
+            "documents": ["Tenth", "Second"],
+            "metadatas": [
+                {"document_id": "doc1", "chunk_id": "chunk_10", "chunk_index": 9},
+                {"document_id": "doc1", "chunk_id": "chunk_2", "chunk_index": 1}
+            ]
+        }
+        result = self.vector_service.get_document_chunks("doc1")
+        self.assertEqual([chunk["content"] for chunk in result["data"]["chunks"]], ["Second", "Tenth"])
+        
+        # Chunks stored without chunk_index fall back to the number in their id
+        self.mock_collection.get.return_value = {
+            "documents": ["Tenth", "Second"],
+            "metadatas": [
+                {"document_id": "doc1", "chunk_id": "chunk_10"},
+                {"document_id": "doc1", "chunk_id": "chunk_2"}
+            ]
+        }
+        result = self.vector_service.get_document_chunks("doc1")
+        self.assertEqual([chunk["content"] for chunk in result["data"]["chunks"]], ["Second", "Tenth"])
+    
     def test_delete_document_vectors(self):
         """Test deleting document vectors"""
         mock_results = {
@@ -197,7 +578,8 @@ class TestVectorService(unittest.TestCase):
         self.assertTrue(result["success"])
         self.assertEqual(result["data"]["deleted_count"], 3)
         
-        # Verify delete was called
+        # Verify only ids were fetched and delete was called
+        self.assertEqual(self.mock_collection.get.call_args.kwargs["include"], [])
         self.mock_collection.delete.assert_called_once_with(ids=mock_results["ids"])
     
     def test_delete_document_vectors_not_found(self):
@@ -248,6 +630,17 @@ class TestVectorService(unittest.TestCase):
         self.assertTrue(health_data["details"]["openai_connected"])
         self.assertTrue(health_data["details"]["collection_accessible"])
         self.assertEqual(health_data["details"]["total_documents"], 5)
+    
+    def test_health_check_reuses_recent_probes(self):
+        """Test a second health check within the TTL does not call OpenAI or ChromaDB again"""
+        self.mock_collection.count.return_value = 5
+        
+        self.vector_service.health_check()
+        result = self.vector_service.health_check()
+        
+        self.assertTrue(result["data"]["healthy"])
+        self.mock_openai_client.embeddings.create.assert_called_once()
+        self.vector_service.client.list_collections.assert_called_once()
 
 class TestVectorServiceIntegration(unittest.TestCase):
     """Integration tests for vector service (requires actual services)"""
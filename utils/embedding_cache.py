@@ -0,0 +1,82 @@
+"""
+Persistent embedding cache keyed by content hash
+"""
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+# SQLite limits the number of bound parameters per statement
+_SQLITE_MAX_PARAMS = 500
+
+def get_text_hash(text: str) -> str:
+    """Generate SHA-256 hash for whitespace-normalized text"""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """SQLite-backed cache of embedding vectors keyed by (model, text hash)"""
+    
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+    
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up cached embeddings
+        
+        Args:
+            model: Embedding model name
+            hashes: Text hashes to look up
+        
+        Returns:
+            Dictionary of hash -> embedding for the cache hits
+        """
+        unique_hashes = list(dict.fromkeys(hashes))
+        results = {}
+        
+        with self._lock:
+            for i in range(0, len(unique_hashes), _SQLITE_MAX_PARAMS):
+                batch = unique_hashes[i:i + _SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for text_hash, vector in rows:
+                    results[text_hash] = np.frombuffer(vector, dtype=np.float32).tolist()
+        
+        return results
+    
+    def put_many(self, model: str, embeddings: Dict[str, List[float]]):
+        """
+        Store embeddings in the cache
+        
+        Args:
+            model: Embedding model name
+            embeddings: Dictionary of hash -> embedding
+        """
+        if not embeddings:
+            return
+        
+        rows = [
+            (model, text_hash, np.asarray(vector, dtype=np.float32).tobytes())
+            for text_hash, vector in embeddings.items()
+        ]
+        
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                rows
+            )
@@ -0,0 +1,43 @@
+"""
+Token-aware truncation of embedding inputs
+"""
+import logging
+from functools import lru_cache
+
+import tiktoken
+
+# Embedding models reject inputs over 8191 tokens
+MAX_EMBEDDING_INPUT_TOKENS = 8191
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def get_embedding_encoding() -> tiktoken.Encoding:
+    """Load the tokenizer shared by the OpenAI embedding models once per process"""
+    return tiktoken.get_encoding("cl100k_base")
+
+def truncate_embedding_input(text: str) -> str:
+    """
+    Cut text to the embedding model's input limit
+    
+    Args:
+        text: Text to embed
+    
+    Returns:
+        The text itself, or its longest prefix that fits in the token limit
+    """
+    # Byte-level BPE tokens cover at least one byte, so short texts cannot exceed the limit
+    if len(text.encode("utf-8")) <= MAX_EMBEDDING_INPUT_TOKENS:
+        return text
+    
+    encoding = get_embedding_encoding()
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= MAX_EMBEDDING_INPUT_TOKENS:
+        return text
+    
+    truncated = encoding.decode(tokens[:MAX_EMBEDDING_INPUT_TOKENS])
+    logger.warning(
+        "Embedding input truncated from %d to %d characters (%d tokens)",
+        len(text), len(truncated), len(tokens)
+    )
+    return truncated
@@ -4,9 +4,19 @@ File handling utilities
 import os
 import hashlib
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Tuple, Optional, BinaryIO
 from config import config
 
+# Buffer size used when streaming uploaded files
+UPLOAD_BUFFER_SIZE = 64 * 1024
+
+# 128-bit BLAKE2b digest keeps the 32-character hex format of the previous MD5 hashes
+FILE_HASH_DIGEST_SIZE = 16
+
+def _new_file_hash():
+    """Create the hash object used for uploaded file content"""
+    return hashlib.blake2b(digest_size=FILE_HASH_DIGEST_SIZE)
+
 def validate_file_type(filename: str) -> bool:
     """Validate if file type is supported"""
     file_extension = filename.lower().split('.')[-1]
@@ -19,7 +29,60 @@ def validate_file_size(file_size: int) -> bool:
 
 def get_file_hash(file_content: bytes) -> str:
     """Generate hash for file content"""
-    return hashlib.md5(file_content).hexdigest()
+    file_hash = _new_file_hash()
+    file_hash.update(file_content)
+    return file_hash.hexdigest()
+
+def get_stream_hash(file_obj: BinaryIO) -> str:
+    """Generate hash for a binary stream, reading it in fixed-size chunks"""
+    file_hash = _new_file_hash()
+    file_obj.seek(0)
+    for chunk in iter(lambda: file_obj.read(UPLOAD_BUFFER_SIZE), b""):
+        file_hash.update(chunk)
+    file_obj.seek(0)
+    return file_hash.hexdigest()
+
+def copy_stream_with_hash(src: BinaryIO, dst: BinaryIO) -> Tuple[str, int]:
+    """
+    Copy a binary stream while hashing it, in a single pass with a reused buffer
+    
+    Args:
+        src: Source stream
+        dst: Destination stream
+        
+    Returns:
+        Tuple of (hash, bytes copied)
+    """
+    file_hash = _new_file_hash()
+    buffer = bytearray(UPLOAD_BUFFER_SIZE)
+    view = memoryview(buffer)
+    size = 0
+    
+    src.seek(0)
+    while True:
+        if hasattr(src, "readinto"):
+            read = src.readinto(buffer)
+        else:
+            chunk = src.read(UPLOAD_BUFFER_SIZE)
+            read = len(chunk)
+            buffer[:read] = chunk
+        if not read:
+            break
+        
+        file_hash.update(view[:read])
+        dst.write(view[:read])
+        size += read
+    
+    return file_hash.hexdigest(), size
+
+def get_stream_size(file_obj: BinaryIO) -> int:
+    """Get the size of a binary stream without reading it"""
+    size = getattr(file_obj, "size", None)
+    if size is None:
+        position = file_obj.tell()
+        size = file_obj.seek(0, os.SEEK_END)
+        file_obj.seek(position)
+    return size
 
 def ensure_upload_directory() -> Path:
     """Ensure upload directory exists"""
@@ -0,0 +1,115 @@
+"""
+In-memory semantic cache of LLM answers keyed by query embedding
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+class SemanticCache:
+    """Per-document LRU cache returning stored answers for near-duplicate questions"""
+    
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1024):
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        
+        # (document_id, scope) -> OrderedDict of matrix row -> payload, least recently used first
+        self._entries: Dict[Tuple[str, str], "OrderedDict[int, Any]"] = {}
+        # (document_id, scope) -> preallocated matrix of unit vectors; rows [0, len(entries)) are in use
+        self._matrices: Dict[Tuple[str, str], np.ndarray] = {}
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        """Convert an embedding to a float32 unit vector, None for a zero vector"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        return vector / norm
+    
+    def get(self, document_id: str, embedding: List[float], scope: str = "") -> Optional[Any]:
+        """
+        Look up the answer of the most similar cached question
+        
+        Args:
+            document_id: Document the question was asked about
+            embedding: Query embedding
+            scope: Settings the answer depends on, only answers stored with the same scope match
+        
+        Returns:
+            Cached payload if its cosine similarity reaches the threshold, None otherwise
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+        
+        key = (document_id, scope)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            
+            matrix = self._matrices[key]
+            if matrix.shape[1] != query.shape[0]:
+                return None
+            
+            # Rows are unit vectors, so the dot product is the cosine similarity
+            similarities = matrix[:len(entries)] @ query
+            row = int(np.argmax(similarities))
+            if similarities[row] < self.threshold:
+                return None
+            
+            entries.move_to_end(row)
+            return entries[row]
+    
+    def put(self, document_id: str, embedding: List[float], payload: Any, scope: str = ""):
+        """
+        Store an answer for a question embedding
+        
+        Args:
+            document_id: Document the question was asked about
+            embedding: Query embedding
+            payload: Answer data to return on later hits
+            scope: Settings the answer depends on
+        """
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        
+        key = (document_id, scope)
+        with self._lock:
+            entries = self._entries.setdefault(key, OrderedDict())
+            matrix = self._matrices.get(key)
+            
+            # Start over if the embedding size changed (a different embedding model)
+            if matrix is None or matrix.shape[1] != vector.shape[0]:
+                entries.clear()
+                matrix = np.empty((min(16, self.max_entries), vector.shape[0]), dtype=np.float32)
+            
+            if len(entries) >= self.max_entries:
+                # Full: the least recently used answer gives up its row
+                row, _ = entries.popitem(last=False)
+            else:
+                # Rows [0, len(entries)) are in use, grow the matrix geometrically when it is full
+                row = len(entries)
+                if row == matrix.shape[0]:
+                    grown = np.empty((min(2 * row, self.max_entries), matrix.shape[1]), dtype=np.float32)
+                    grown[:row] = matrix
+                    matrix = grown
+            
+            matrix[row] = vector
+            entries[row] = payload
+            self._matrices[key] = matrix
+    
+    def invalidate(self, document_id: Optional[str] = None):
+        """Drop cached answers for one document in every scope, or for all documents"""
+        with self._lock:
+            if document_id is None:
+                self._entries.clear()
+                self._matrices.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == document_id]:
+                    del self._entries[key]
+                    self._matrices.pop(key, None)